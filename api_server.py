@@ -0,0 +1,193 @@
+import argparse
+import hashlib
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from helper_functions import merge_ingredients_into_recipes
+from storage import get_storage
+
+# Read-only JSON API for the POS / purchasing sheet:
+#   python api_server.py --port 8600
+#
+#   GET /                     index: endpoints + data version
+#   GET /recipes              all recipes with current costs
+#   GET /recipes/<编号>
+#   GET /ingredients          the ingredient catalog
+#   GET /ingredients/<编号>
+#   GET /costs                编号 / names / 分类 / 售价 / 总成本 / 成本百分比 per recipe
+#
+# Responses carry an ETag; send it back as If-None-Match to get a 304.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+
+COST_FIELDS = ["编号", "中文名", "英文名", "分类", "售价", "总成本", "成本百分比"]
+
+
+def _clean(value):
+    """NaN -> None and numpy scalars -> Python, recursively, for json.dumps."""
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _encode(data):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+class Snapshot:
+    """Everything the API serves for one data version.
+
+    Costs are computed once per version instead of per request, and list
+    responses are serialized up front; single items are serialized on first
+    request and kept.
+    """
+
+    def __init__(self, storage, version):
+        self.version = version
+        self.built = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        catalog = storage.load_catalog()
+        recipes = merge_ingredients_into_recipes(storage.load_recipes(), catalog=catalog)
+
+        self.recipes = {r.get("编号"): _clean(r) for r in recipes}
+        self.ingredients = {serial: _clean(dict(row)) for serial, row in catalog.by_serial.items()}
+        costs = [{f: r.get(f) for f in COST_FIELDS} for r in self.recipes.values()]
+
+        self._responses = {
+            "/recipes": _encode(list(self.recipes.values())),
+            "/ingredients": _encode(list(self.ingredients.values())),
+            "/costs": _encode(costs),
+            "/": _encode({
+                "endpoints": ["/recipes", "/recipes/<编号>", "/ingredients", "/ingredients/<编号>", "/costs"],
+                "built": self.built,
+                "recipes": len(self.recipes),
+                "ingredients": len(self.ingredients),
+            }),
+        }
+        self._lock = threading.Lock()
+
+    def response(self, path):
+        """(body, etag) for `path`, or None if there is no such resource."""
+        path = path.rstrip("/") or "/"
+        with self._lock:
+            cached = self._responses.get(path)
+        if cached is not None:
+            return cached
+
+        kind, _, key = path.lstrip("/").partition("/")
+        source = {"recipes": self.recipes, "ingredients": self.ingredients}.get(kind)
+        if source is None or key not in source:
+            return None
+        encoded = _encode(source[key])
+        with self._lock:
+            self._responses[path] = encoded
+        return encoded
+
+
+class SnapshotCache:
+    """Holds the current Snapshot; rebuilt only when storage.data_version() moves."""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = self.storage.data_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            # Another request may have rebuilt it while we waited
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = Snapshot(self.storage, version)
+                print(f"🔄 Snapshot rebuilt at {self._snapshot.built}")
+            return self._snapshot
+
+
+def make_handler(cache):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "RecipeAPI/1.0"
+
+        def _send(self, status, body=b"", etag=None, head=False):
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            if status != 304:
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body and not head and status != 304:
+                self.wfile.write(body)
+
+        def _serve(self, head=False):
+            path = unquote(urlsplit(self.path).path)
+            try:
+                found = cache.get().response(path)
+            except Exception as e:  # keep serving; the next request retries the build
+                body, _ = _encode({"error": f"could not load data: {e}"})
+                return self._send(500, body, head=head)
+            if found is None:
+                body, _ = _encode({"error": f"not found: {path}"})
+                return self._send(404, body, head=head)
+
+            body, etag = found
+            client_tags = [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]
+            if etag in client_tags or "*" in client_tags:
+                return self._send(304, etag=etag)
+            self._send(200, body, etag, head=head)
+
+        def do_GET(self):
+            self._serve()
+
+        def do_HEAD(self):
+            self._serve(head=True)
+
+        def _read_only(self):
+            body, _ = _encode({"error": "read-only API"})
+            self.send_response(405)
+            self.send_header("Allow", "GET, HEAD")
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_POST = do_PUT = do_PATCH = do_DELETE = _read_only
+
+        def log_message(self, format, *args):
+            pass  # polled every few seconds; don't flood the console
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API over recipes and ingredients")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--storage", help='"file" or "sqlite" (default: RECIPE_APP_STORAGE or file)')
+    args = parser.parse_args()
+
+    cache = SnapshotCache(get_storage(args.storage))
+    cache.get()  # build up front so the first client doesn't wait
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cache))
+    print(f"🚀 Serving on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from datetime import datetime
 import unicodedata #for weChat pasting
 
 from helper_functions import compute_unit_cost
+from profiling import rerun
 
 st.set_page_config(page_title="食材数据库", layout="wide")
 
@@ -13,10 +14,14 @@ pages = {
     "🥬 食材 Ingredients": [
         st.Page("pages/All_Ingredients.py", title="所有食材 View Ingredients"),
         st.Page("pages/Add_Ingredient.py", title="加新食材 Add Ingredient"),
+        st.Page("pages/Import_Prices.py", title="导入价格表 Import Prices"),
+        st.Page("pages/Price_History.py", title="价格历史 Price History"),
     ],
     "📖 配方 Recipes": [
         st.Page("pages/All_Recipes.py", title="所有配方 All Recipes"),
         st.Page("pages/Add_Recipe.py", title="加新配方 Add Recipe"),
+        st.Page("pages/Price_Scenarios.py", title="价格模拟 Price Scenarios"),
+        st.Page("pages/Store_Prices.py", title="门店价格 Store Prices"),
     ],
      "饮料 Beverages": [
         st.Page("pages/Beverages.py", title="饮料 Beverages"),
@@ -25,7 +30,10 @@ pages = {
 }
 
 pg = st.navigation(pages)
-pg.run()
+
+# Per-rerun timings (debug panel with ?debug=1 or RECIPE_APP_DEBUG=1)
+with rerun(pg.title):
+    pg.run()
 
 # # File Name for database
 # DATA_FILE = "ingredients.csv"
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+BACKUP_DIR = "backups"
+OBJECTS_DIR = "objects"  # inside BACKUP_DIR: gzip'd file contents named by sha256
+SNAPSHOTS_FILE = "snapshots.json"  # inside BACKUP_DIR
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+# Retention: every snapshot from the last KEEP_ALL_DAYS, the last one per day
+# for KEEP_DAILY_DAYS, then the last one per ISO week
+KEEP_ALL_DAYS = 1
+KEEP_DAILY_DAYS = 30
+
+_LOCK = threading.Lock()
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _object_path(backup_dir, digest):
+    return os.path.join(backup_dir, OBJECTS_DIR, digest[:2], digest + ".gz")
+
+
+def _store_object(backup_dir, path, digest):
+    target = _object_path(backup_dir, digest)
+    if os.path.exists(target):
+        return False  # same content already stored
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, target)
+    return True
+
+
+def list_snapshots(backup_dir=BACKUP_DIR):
+    """Snapshots oldest first: [{"timestamp", "files": {label: {"sha256", "size"}}}]."""
+    path = os.path.join(backup_dir, SNAPSHOTS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_snapshots(backup_dir, snapshots):
+    path = os.path.join(backup_dir, SNAPSHOTS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshots, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def snapshot(files, timestamp, backup_dir=BACKUP_DIR, prune_after=True):
+    """Back up `files` ({label: path}) as one snapshot.
+
+    File contents are stored once per sha256, so an unchanged file costs
+    nothing; if nothing changed since the last snapshot no snapshot is added.
+    Returns the new snapshot dict, or None when it was skipped.
+    """
+    with _LOCK:
+        os.makedirs(backup_dir, exist_ok=True)
+        entry = {"timestamp": timestamp, "files": {}}
+        for label, path in files.items():
+            if not os.path.exists(path):
+                continue
+            digest = _sha256(path)
+            _store_object(backup_dir, path, digest)
+            entry["files"][label] = {"sha256": digest, "size": os.path.getsize(path)}
+
+        snapshots = list_snapshots(backup_dir)
+        if snapshots and snapshots[-1]["files"] == entry["files"]:
+            return None
+        snapshots.append(entry)
+        _write_snapshots(backup_dir, snapshots)
+
+    if prune_after:
+        prune(backup_dir)
+    return entry
+
+
+def _keep(snapshots, now):
+    """Timestamps to keep under the retention policy."""
+    keep, seen_days, seen_weeks = set(), set(), set()
+    # Newest first, so the first one seen in a day/week is that period's last
+    for snap in sorted(snapshots, key=lambda s: s["timestamp"], reverse=True):
+        taken = datetime.strptime(snap["timestamp"], TIMESTAMP_FORMAT)
+        age = now - taken
+        if age < timedelta(days=KEEP_ALL_DAYS):
+            keep.add(snap["timestamp"])
+        elif age < timedelta(days=KEEP_DAILY_DAYS):
+            if taken.date() not in seen_days:
+                keep.add(snap["timestamp"])
+            seen_days.add(taken.date())
+        else:
+            week = taken.isocalendar()[:2]
+            if week not in seen_weeks:
+                keep.add(snap["timestamp"])
+            seen_weeks.add(week)
+    return keep
+
+
+def prune(backup_dir=BACKUP_DIR, now=None):
+    """Apply the retention policy and delete objects no snapshot references.
+
+    Returns the number of snapshots removed.
+    """
+    now = now or datetime.now()
+    with _LOCK:
+        snapshots = list_snapshots(backup_dir)
+        keep = _keep(snapshots, now)
+        kept = [s for s in snapshots if s["timestamp"] in keep]
+        removed = len(snapshots) - len(kept)
+        if not removed:
+            return 0
+        _write_snapshots(backup_dir, kept)
+
+        referenced = {f["sha256"] for s in kept for f in s["files"].values()}
+        objects_root = os.path.join(backup_dir, OBJECTS_DIR)
+        for sub in os.listdir(objects_root) if os.path.isdir(objects_root) else []:
+            for name in os.listdir(os.path.join(objects_root, sub)):
+                if name.endswith(".gz") and name[:-3] not in referenced:
+                    os.remove(os.path.join(objects_root, sub, name))
+    return removed
+
+
+def find_snapshot(timestamp=None, backup_dir=BACKUP_DIR):
+    """Latest snapshot taken at or before `timestamp` (latest overall when None)."""
+    snapshots = list_snapshots(backup_dir)
+    if timestamp is not None:
+        snapshots = [s for s in snapshots if s["timestamp"] <= timestamp]
+    return snapshots[-1] if snapshots else None
+
+
+def extract_file(snap, label, path, backup_dir=BACKUP_DIR):
+    """Write the stored copy of `label` from `snap` to `path` (atomically)."""
+    stored = snap["files"][label]
+    tmp_path = path + ".restore"
+    with gzip.open(_object_path(backup_dir, stored["sha256"]), "rb") as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, path)
+
+
+def restore(timestamp, files, backup_dir=BACKUP_DIR):
+    """Put `files` ({label: path}) back to the snapshot at or before `timestamp`.
+
+    The current files are snapshotted first, so a restore can be undone. Files
+    that did not exist in the snapshot are removed. Returns the snapshot used.
+    """
+    snap = find_snapshot(timestamp, backup_dir)
+    if snap is None:
+        raise FileNotFoundError(f"No backup at or before {timestamp}")
+
+    snapshot(files, datetime.now().strftime(TIMESTAMP_FORMAT), backup_dir, prune_after=False)
+    for label, path in files.items():
+        if label in snap["files"]:
+            extract_file(snap, label, path, backup_dir)
+        elif os.path.exists(path):
+            os.remove(path)
+    return snap
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from catalog import apply_ingredient_edits, columnar_path, invalidate_catalog, load_catalog
+from helper_functions import compute_unit_cost, compute_unit_costs, merge_ingredients_into_recipes, recost_recipes
+from recipe_store import append_recipe_changes, get_recipe, iter_recipes, load_recipes, save_recipes
+from scenarios import ScenarioRunner
+from storage import FileStorage
+from store_prices import StoreOverlay, store_costs
+from synthetic import edit_prices, make_ingredients, make_recipes
+
+# Synthetic data sizes: name -> (ingredients, recipes)
+SIZES = {
+    "small": (1_000, 100),
+    "medium": (10_000, 1_000),
+    "large": (100_000, 10_000),
+}
+
+# helpers/ scripts timed end to end (they read and write ../ingredients.csv etc.)
+HELPER_SCRIPTS = [
+    ["recalculate_costs.py"],
+    ["add_serial.py"],
+    ["update_recipes_from_ingredients.py"],
+    ["import_price_list.py", "price_list.csv"],
+]
+
+
+def measure(fn, repeat, setup=None):
+    """Run `fn(setup())` `repeat` times; returns the wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class Workspace:
+    """Temp copy of the app code plus synthetic ingredients.csv / recipes.json."""
+
+    def __init__(self, n_ingredients, n_recipes):
+        self.dir = tempfile.mkdtemp(prefix="recipe_bench_")
+        for name in os.listdir(REPO_DIR):
+            if name.endswith(".py"):
+                shutil.copy(os.path.join(REPO_DIR, name), self.dir)
+        shutil.copytree(os.path.join(REPO_DIR, "helpers"), os.path.join(self.dir, "helpers"),
+                        ignore=shutil.ignore_patterns("__pycache__"))
+
+        self.ingredients = make_ingredients(n_ingredients)
+        self.recipes = make_recipes(n_recipes, self.ingredients)
+        self.ingredient_path = os.path.join(self.dir, "ingredients.csv")
+        self.recipe_path = os.path.join(self.dir, "recipes.json")
+        self.ingredients.to_csv(self.ingredient_path + ".orig", index=False, encoding="utf-8-sig")
+        with open(self.recipe_path + ".orig", "w", encoding="utf-8") as f:
+            json.dump(self.recipes, f, ensure_ascii=False, indent=2)
+
+        # A weekly price list: 1% repriced items, 1% new ones
+        prices = edit_prices(self.ingredients, 0.01)
+        changed = prices[prices["单位价格"] != self.ingredients["单位价格"]]
+        new = make_ingredients(max(1, n_ingredients // 100), seed=1)
+        new["食材中文名"] = "新" + new["食材中文名"]
+        pd.concat([changed, new])[["食材中文名", "食材分类", "单位", "单位价格", "单位容量"]].to_csv(
+            os.path.join(self.dir, "helpers", "price_list.csv"), index=False
+        )
+        self.reset()
+
+    def reset(self):
+        shutil.copy(self.ingredient_path + ".orig", self.ingredient_path)
+        shutil.copy(self.recipe_path + ".orig", self.recipe_path)
+        journal = self.recipe_path + ".journal.jsonl"
+        if os.path.exists(journal):
+            os.remove(journal)
+        invalidate_catalog()
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def bench_size(size, repeat, skip_helpers=False):
+    n_ingredients, n_recipes = SIZES[size]
+    ws = Workspace(n_ingredients, n_recipes)
+    cwd = os.getcwd()
+    os.chdir(ws.dir)  # backups/ and other relative paths land in the workspace
+    results = []
+
+    def record(name, times):
+        results.append({
+            "name": name,
+            "size": size,
+            "ingredients": n_ingredients,
+            "recipes": n_recipes,
+            "times": [round(t, 6) for t in times],
+            "min": round(min(times), 6),
+            "median": round(statistics.median(times), 6),
+        })
+        print(f"  {name:<42} min {min(times):8.4f}s  median {statistics.median(times):8.4f}s")
+
+    df = ws.ingredients
+    print(f"📊 {size}: {n_ingredients} ingredients, {n_recipes} recipes")
+
+    # --- Costing ---
+    rows = list(zip(df["单位"], df["单位价格"], df["单位容量"]))
+    record("compute_unit_cost (per row)", measure(lambda _: [compute_unit_cost(*r) for r in rows], repeat))
+    record("compute_unit_costs (column)", measure(
+        lambda _: compute_unit_costs(df["单位"], df["单位价格"], df["单位容量"]), repeat
+    ))
+
+    # --- Catalog ---
+    def no_columnar():
+        ws.reset()
+        if os.path.exists(columnar_path(ws.ingredient_path)):
+            os.remove(columnar_path(ws.ingredient_path))
+
+    record("load_catalog (cold, CSV)", measure(lambda _: load_catalog(ws.ingredient_path), repeat, setup=no_columnar))
+    record("load_catalog (cold)", measure(lambda _: load_catalog(ws.ingredient_path), repeat, setup=ws.reset))
+    record("load_catalog (warm)", measure(lambda _: load_catalog(ws.ingredient_path), repeat))
+
+    # --- Merge ---
+    record("merge_ingredients_into_recipes", measure(
+        lambda recipes: merge_ingredients_into_recipes(recipes, catalog=load_catalog(ws.ingredient_path)),
+        repeat, setup=lambda: json.loads(json.dumps(ws.recipes)),
+    ))
+
+    # --- What-if scenarios: 30 category-wide price changes at once ---
+    categories = sorted(df["食材分类"].unique())
+    scenarios = {f"{c} +{p}%": [("食材分类", c, p)] for c in categories for p in (5, 10, 15, 20)}
+    scenarios = dict(list(scenarios.items())[:30])
+    record("ScenarioRunner build", measure(
+        lambda _: ScenarioRunner(ws.recipes, load_catalog(ws.ingredient_path)), repeat
+    ))
+    runner = ScenarioRunner(ws.recipes, load_catalog(ws.ingredient_path))
+    record("ScenarioRunner.run (30 scenarios)", measure(lambda _: runner.run(scenarios), repeat))
+
+    # --- Stores: 10 overlays, each overriding 5% of the prices ---
+    overlays = [
+        StoreOverlay(f"store{i}", df.sample(frac=0.05, random_state=i)[["编号", "单位价格"]].assign(
+            单位价格=lambda d: d["单位价格"] * 1.1
+        ))
+        for i in range(10)
+    ]
+    record("store_costs (10 stores)", measure(
+        lambda _: store_costs(ws.recipes, load_catalog(ws.ingredient_path), overlays), repeat
+    ))
+
+    # --- Recipe persistence ---
+    ws.reset()
+    record("load_recipes", measure(lambda _: load_recipes(ws.recipe_path), repeat))
+    record("save_recipes", measure(lambda _: save_recipes(ws.recipes, ws.recipe_path), repeat))
+    record("iter_recipes (list fields)", measure(
+        lambda _: sum(1 for _ in iter_recipes(ws.recipe_path, fields=["编号", "中文名", "分类"])), repeat
+    ))
+    middle = ws.recipes[len(ws.recipes) // 2]["编号"]
+    record("get_recipe (one by 编号)", measure(lambda _: get_recipe(middle, ws.recipe_path), repeat))
+    record("append_recipe_changes (1 recipe)", measure(
+        lambda _: append_recipe_changes(upserts=ws.recipes[:1], path=ws.recipe_path), repeat, setup=ws.reset
+    ))
+
+    # --- All_Ingredients save path: diff, write CSV, recost affected recipes ---
+    def save_path(edited):
+        storage = FileStorage(ws.ingredient_path, ws.recipe_path)
+        catalog = storage.load_catalog()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        updated, summary = apply_ingredient_edits(catalog.df, catalog.df, edited, now)
+        changed = set(summary["changed"])
+        storage.save_ingredients(updated, changed)
+        recipes = storage.load_recipes()
+        affected = storage.ingredient_index(recipes).recipes_using(changed)
+        storage.upsert_recipes(recost_recipes(recipes, affected, storage.load_catalog(), now))
+
+    def save_setup():
+        ws.reset()
+        return edit_prices(load_catalog(ws.ingredient_path).df, 0.01)
+
+    record("All_Ingredients save (1% edited)", measure(save_path, repeat, setup=save_setup))
+
+    # --- helpers/ scripts, as subprocesses ---
+    if not skip_helpers:
+        for script in HELPER_SCRIPTS:
+            record(f"helpers/{script[0]}", measure(
+                lambda _: subprocess.run(
+                    [sys.executable, *script], cwd=os.path.join(ws.dir, "helpers"),
+                    check=True, stdout=subprocess.DEVNULL,
+                ),
+                repeat, setup=ws.reset,
+            ))
+
+    os.chdir(cwd)
+    ws.cleanup()
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print median ratios against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+    print(f"\n🔍 Compared with {baseline_path} ({baseline['meta'].get('commit')})")
+    for r in results:
+        old = before.get((r["name"], r["size"]))
+        if old:
+            ratio = r["median"] / old
+            flag = "⚠️" if ratio > 1.2 else "  "
+            print(f"{flag} {r['size']:<7}{r['name']:<42} {old:8.4f}s -> {r['median']:8.4f}s  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark costing and persistence on synthetic data")
+    parser.add_argument("--size", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--skip-helpers", action="store_true", help="don't time the helpers/ scripts")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)  # the run chdirs into temp workspaces
+
+    results = []
+    for size in args.size:
+        results += bench_size(size, args.repeat, args.skip_helpers)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
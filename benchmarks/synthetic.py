@@ -0,0 +1,92 @@
+import random
+
+import pandas as pd
+
+from catalog import CATEGORY_PREFIX, allocate_serials
+from helper_functions import compute_unit_costs
+from storage import INGREDIENT_COLUMNS
+
+# Unit mix roughly like the real catalog: weights first, then packaged goods
+# (瓶/盒/包 carry a 单位容量), plus a few units we can't price (个)
+UNITS = ["g", "kg", "斤", "ml", "L", "瓶", "盒", "包", "个"]
+UNIT_WEIGHTS = [10, 35, 15, 5, 5, 10, 8, 8, 4]
+PACKAGE_UNITS = {"瓶": [250, 500, 750, 1000], "盒": [100, 200, 500, 1000], "包": [50, 100, 500, 1000, 2500]}
+
+NAME_PARTS = ["牛", "猪", "鸡", "鱼", "虾", "葱", "姜", "蒜", "酱", "油", "盐", "糖", "椒", "菇", "笋", "豆"]
+EN_PARTS = ["beef", "pork", "chicken", "fish", "shrimp", "scallion", "ginger", "garlic", "sauce", "oil"]
+RECIPE_CATEGORIES = ["BBQ/烤肉", "凉菜", "热菜", "主食", "汤", "甜品"]
+
+NOW = "2026-01-01 12:00:00"
+
+
+def make_ingredients(n, seed=0):
+    """A catalog DataFrame with `n` rows in the ingredients.csv layout."""
+    rng = random.Random(seed)
+    categories = rng.choices(list(CATEGORY_PREFIX), k=n)
+    units = rng.choices(UNITS, weights=UNIT_WEIGHTS, k=n)
+    volumes = [float(rng.choice(PACKAGE_UNITS[u])) if u in PACKAGE_UNITS else None for u in units]
+    prices = [round(rng.uniform(1, 500), 2) for _ in range(n)]
+    df = pd.DataFrame({
+        "编号": allocate_serials([], categories),
+        "供应商": rng.choices(["A供应", "B供应", "C供应", None], k=n),
+        "食材英文名": [f"{rng.choice(EN_PARTS)} {i}" for i in range(n)],
+        "食材中文名": ["".join(rng.choices(NAME_PARTS, k=3)) + str(i) for i in range(n)],
+        "食材分类": categories,
+        "单位": units,
+        "单位价格": prices,
+        "单位容量": volumes,
+    })
+    df["基础单位价格"] = compute_unit_costs(df["单位"], df["单位价格"], df["单位容量"])
+    df["创建时间"] = NOW
+    df["修改时间"] = NOW
+    return df[INGREDIENT_COLUMNS]
+
+
+def make_recipes(n, ingredients, seed=0, lines=(3, 12)):
+    """`n` recipes in the recipes.json layout using serials from `ingredients`."""
+    rng = random.Random(seed)
+    rows = ingredients[["编号", "食材中文名", "食材英文名", "基础单位价格"]].to_dict("records")
+    recipes = []
+    for i in range(n):
+        items = []
+        for ing in rng.sample(rows, min(len(rows), rng.randint(*lines))):
+            qty = float(rng.choice([5, 10, 20, 50, 100, 160, 250]))
+            price = ing["基础单位价格"] if pd.notna(ing["基础单位价格"]) else 0
+            items.append({
+                "编号": ing["编号"],
+                "食材中文名": ing["食材中文名"],
+                "用量": qty,
+                "单价": price,
+                "小计": round(price * qty, 2),
+                "基础单位价格": price,
+                "总成本": price * qty,
+                "食材英文名": ing["食材英文名"],
+                "备注": "",
+            })
+        total = round(sum(item["小计"] for item in items), 2)
+        price = float(rng.choice([38, 58, 88, 128, 158, 198]))
+        recipes.append({
+            "编号": f"RC-{i + 1:04d}",
+            "英文名": f"Dish {i}",
+            "中文名": f"菜品{i}",
+            "分类": rng.choice(RECIPE_CATEGORIES),
+            "售价": price,
+            "总成本": total,
+            "成本百分比": round(total / price * 100, 2),
+            "食材": items,
+            "步骤": [],
+            "备注": "",
+            "主图": "",
+            "创建时间": NOW,
+            "修改时间": NOW,
+            "SKUID": str(8000000000 + i),
+        })
+    return recipes
+
+
+def edit_prices(df, fraction=0.01, seed=0):
+    """Copy of `df` with `fraction` of the 单位价格 bumped by 10% (a typical save)."""
+    edited = df.copy()
+    rows = edited.sample(frac=fraction, random_state=seed).index
+    edited.loc[rows, "单位价格"] = (edited.loc[rows, "单位价格"] * 1.1).round(2)
+    return edited
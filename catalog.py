@@ -0,0 +1,355 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from helper_functions import clean_ingredient_df, compute_unit_costs
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: without it the CSV is parsed on every change
+    pa = pq = None
+
+# File Name for database
+DATA_FILE = "ingredients.csv"
+
+# Typed columnar copy of the CSV (ingredients.parquet). The CSV stays the file
+# people edit; the copy records the CSV's sha1 and is only used while it matches.
+COLUMNAR_SUFFIX = ".parquet"
+TEXT_COLUMNS = ["编号", "食材英文名", "食材中文名"]
+CATEGORY_COLUMNS = ["食材分类", "单位", "供应商"]
+DATETIME_COLUMNS = ["创建时间", "修改时间"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+_SOURCE_KEY = b"source_sha1"
+
+# Process-wide cache: absolute path -> Catalog
+# Streamlit keeps imported modules alive between reruns, so every page and
+# every browser session shares this dict.
+_CATALOG_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+# Guards the per-version caches handed to cached_per_version
+_VERSION_CACHE_LOCK = threading.Lock()
+
+
+class Catalog:
+    """Parsed ingredients.csv shared by all pages.
+
+    `df` is the cleaned DataFrame, `by_serial` maps 编号 -> row dict and
+    `unit_prices` maps 编号 -> freshly computed 基础单位价格 (None for unknown
+    units). All are shared between reruns, so callers must copy before mutating.
+    """
+
+    def __init__(self, path, df, signature, digest):
+        self.path = path
+        self.df = df
+        self.signature = signature
+        self.digest = digest
+        self._typed = None
+        # Column lists + zip: much faster than to_dict("records") on Arrow strings
+        columns = list(df.columns)
+        rows = zip(*(df[col].tolist() for col in columns))
+        self.by_serial = {}
+        for values in rows:
+            row = dict(zip(columns, values))
+            self.by_serial[row["编号"]] = row
+        prices = compute_unit_costs(df["单位"], df["单位价格"], df["单位容量"])
+        self.unit_prices = {
+            serial: (None if price != price else price)  # NaN -> None
+            for serial, price in zip(df["编号"].tolist(), prices.tolist())
+        }
+
+    @property
+    def version(self):
+        """Changes whenever the file content changes."""
+        return self.digest
+
+    def get(self, serial, default=None):
+        return self.by_serial.get(serial, default)
+
+    @property
+    def typed(self):
+        """The catalog with real dtypes: categoricals, floats, datetimes, NaN for missing text."""
+        if self._typed is None:
+            self._typed = _read_columnar(self.path, self.digest)
+            if self._typed is None:
+                self._typed = to_typed(self.df)
+        return self._typed
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse_catalog(path):
+    df = pd.read_csv(path)
+    return clean_ingredient_df(df)
+
+
+def columnar_path(path):
+    return os.path.splitext(path)[0] + COLUMNAR_SUFFIX
+
+
+def to_typed(df):
+    """Clean catalog frame -> typed frame."""
+    typed = df.copy()
+    for col in TEXT_COLUMNS + CATEGORY_COLUMNS:
+        if col in typed.columns:
+            typed[col] = typed[col].where(typed[col] != "")
+            if col in CATEGORY_COLUMNS:
+                typed[col] = typed[col].astype("category")
+    for col in DATETIME_COLUMNS:
+        if col in typed.columns:
+            typed[col] = pd.to_datetime(typed[col], format=TIMESTAMP_FORMAT, errors="coerce")
+    return typed
+
+
+def _format_datetimes(values):
+    # Timestamps repeat a lot (bulk imports share one), so format each once
+    codes, uniques = pd.factorize(values)
+    formatted = np.asarray(uniques.strftime(TIMESTAMP_FORMAT), dtype=object)
+    out = np.where(codes >= 0, formatted[np.maximum(codes, 0)], None)
+    return pd.Series(out, index=values.index, dtype="str")
+
+
+def from_typed(typed):
+    """Typed frame -> the clean_ingredient_df form the pages edit."""
+    df = typed.copy()
+    for col in TEXT_COLUMNS + CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("str").fillna("")
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = _format_datetimes(df[col])
+    # clean_ingredient_df blanks a missing 修改时间 but leaves 创建时间 as NaN
+    if "修改时间" in df.columns:
+        df["修改时间"] = df["修改时间"].fillna("")
+    return df
+
+
+def _read_columnar(path, digest):
+    """Typed frame from the columnar copy of `path`, or None if missing/stale."""
+    cpath = columnar_path(path)
+    if pq is None or not os.path.exists(cpath):
+        return None
+    try:
+        metadata = pq.read_schema(cpath).metadata or {}
+        if metadata.get(_SOURCE_KEY) != digest.encode():
+            return None
+        return pq.read_table(cpath).to_pandas()
+    except (OSError, pa.ArrowException) as e:
+        print(f"⚠️ Ignoring unreadable {cpath}: {e}")
+        return None
+
+
+def _write_columnar(path, df, digest):
+    """Store `df` (clean form of the CSV with sha1 `digest`) as typed Parquet."""
+    if pa is None:
+        return False
+    typed = to_typed(df)
+    # Only keep a copy that reads back exactly like the CSV
+    if not from_typed(typed).equals(df):
+        return False
+    cpath = columnar_path(path)
+    try:
+        table = pa.Table.from_pandas(typed, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_SOURCE_KEY] = digest.encode()
+        tmp_path = cpath + ".tmp"
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, cpath)
+    except (OSError, pa.ArrowException) as e:
+        print(f"⚠️ Could not write {cpath}: {e}")
+        return False
+    return True
+
+
+def _load_frame(path, digest):
+    """Clean catalog frame, from the columnar copy when it is current."""
+    typed = _read_columnar(path, digest)
+    if typed is not None:
+        return from_typed(typed)
+    df = _parse_catalog(path)
+    _write_columnar(path, df, digest)
+    return df
+
+
+def load_catalog(path=DATA_FILE):
+    """Return the cached Catalog for `path`, re-parsing only when the file changed.
+
+    mtime/size is checked on every call (one stat). When it moved, the file is
+    hashed and only re-parsed if the content really differs, so a `touch` or a
+    save that wrote identical bytes keeps the cached frame. A new process reads
+    the typed Parquet copy instead of the CSV when it was made from the same bytes.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Ingredient file not found: {path}")
+
+    key = os.path.abspath(path)
+    signature = _file_signature(path)
+
+    with _CACHE_LOCK:
+        cached = _CATALOG_CACHE.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached
+
+        digest = _file_digest(path)
+        if cached is not None and cached.digest == digest:
+            cached.signature = signature
+            return cached
+
+        catalog = Catalog(key, _load_frame(path, digest), signature, digest)
+        _CATALOG_CACHE[key] = catalog
+        return catalog
+
+
+def invalidate_catalog(path=None):
+    """Drop one cached catalog (or all of them when `path` is None)."""
+    with _CACHE_LOCK:
+        if path is None:
+            _CATALOG_CACHE.clear()
+        else:
+            _CATALOG_CACHE.pop(os.path.abspath(path), None)
+
+
+def cached_per_version(catalog, builder, cache, limit=4):
+    """`builder(catalog)`, kept in `cache` (a dict) per catalog version.
+
+    Old versions are never asked for again, so only the `limit` newest are
+    kept. A concurrent miss may build twice; the last one stored wins.
+    """
+    with _VERSION_CACHE_LOCK:
+        value = cache.get(catalog.version)
+    if value is None:
+        value = builder(catalog)
+        with _VERSION_CACHE_LOCK:
+            cache[catalog.version] = value
+            while len(cache) > limit:
+                cache.pop(next(iter(cache)))
+    return value
+
+
+# Category to prefix mapping
+CATEGORY_PREFIX = {
+    "未加工肉类": "RME",
+    "加工肉类": "PME",
+    "海鲜类": "SEA",
+    "冻品类": "FRZ",
+    "调味品": "CON",
+    "干货": "DRY",
+    "蔬菜": "VEG",
+    "预制品": "PRE",
+    "厨房用品": "KTC"
+}
+
+# Columns the user can't edit directly in the ingredient table
+NON_EDITABLE_COLUMNS = ["创建时间", "修改时间", "编号", "基础单位价格"]
+
+# A change in any of these means 基础单位价格 must be recomputed
+PRICE_COLUMNS = ["单位", "单位价格", "单位容量"]
+
+
+def allocate_serials(existing_serials, categories):
+    """New 编号s for rows in `categories`, continuing each prefix's highest number.
+
+    One grouped pass: the next free number per prefix is found once, then rows
+    of the same category are numbered with a cumulative count.
+    """
+    categories = pd.Series(list(categories), dtype=object)
+    if categories.empty:
+        return []
+    prefixes = categories.map(lambda c: CATEGORY_PREFIX.get(c, "UNK"))
+
+    existing = pd.Series(list(existing_serials), dtype=object).dropna().astype(str)
+    parts = existing.str.extract(r"^([A-Z]+)-(\d+)$")
+    highest = pd.to_numeric(parts[1], errors="coerce").groupby(parts[0]).max()
+
+    start = prefixes.map(highest).fillna(0).astype(int)
+    numbers = start + prefixes.groupby(prefixes).cumcount() + 1
+    return [f"{p}-{n:04d}" for p, n in zip(prefixes, numbers)]
+
+
+def cells_differ(old, new):
+    both_missing = old.isna() & new.isna()
+    # Compare as objects so an int from the editor equals the stored float
+    same = old.astype(object).eq(new.astype(object))
+    return ~(same | both_missing)
+
+
+def apply_ingredient_edits(df, shown_df, edited_df, now):
+    """Apply a st.data_editor result to the full catalog in one vectorized diff.
+
+    `shown_df` is what the editor was given (a filtered view of `df`), so rows
+    missing from `edited_df` were deleted by the user. Rows without 编号 are new.
+    Returns `(updated_df, summary)` where summary has `changed` (编号 -> list of
+    columns), `added` and `deleted` (lists of 编号).
+    """
+    base = df.drop_duplicates("编号").set_index("编号")
+    edited = edited_df.copy()
+
+    has_serial = edited["编号"].notna() & (edited["编号"].astype(str).str.strip() != "")
+    kept = edited[has_serial].drop_duplicates("编号").set_index("编号")
+    kept = kept[base.index.get_indexer(kept.index) >= 0]
+    new_rows = edited[~has_serial]
+
+    # --- Changed cells ---
+    cols = [c for c in kept.columns if c in base.columns and c not in NON_EDITABLE_COLUMNS]
+    old = base.loc[kept.index, cols]
+    diff = pd.DataFrame({c: cells_differ(old[c], kept[c]) for c in cols}, index=kept.index)
+    changed_mask = diff.any(axis=1)
+    changed = {
+        serial: [c for c in cols if row[c]]
+        for serial, row in diff[changed_mask].iterrows()
+    }
+
+    updated = base.copy()
+    changed_serials = list(changed)
+    if changed_serials:
+        for c in cols:
+            col_changed = diff.index[diff[c]]
+            if len(col_changed):
+                updated.loc[col_changed, c] = kept.loc[col_changed, c]
+        updated.loc[changed_serials, "修改时间"] = now
+
+        price_cols = [c for c in PRICE_COLUMNS if c in cols]
+        repriced = diff.index[diff[price_cols].any(axis=1)] if price_cols else []
+        if len(repriced):
+            updated.loc[repriced, "基础单位价格"] = compute_unit_costs(
+                updated.loc[repriced, "单位"], updated.loc[repriced, "单位价格"], updated.loc[repriced, "单位容量"]
+            ).values
+
+    # --- Deleted rows (shown in the editor but no longer in its result) ---
+    shown = set(shown_df["编号"].dropna())
+    deleted = sorted(shown - set(edited.loc[has_serial, "编号"]))
+    updated = updated.drop(index=deleted, errors="ignore")
+
+    updated = updated.reset_index()
+
+    # --- New rows ---
+    added = []
+    new_rows = new_rows.dropna(how="all")
+    if not new_rows.empty:
+        new_rows = new_rows.reindex(columns=df.columns).copy()
+        new_rows["编号"] = allocate_serials(updated["编号"], new_rows["食材分类"])
+        new_rows["基础单位价格"] = compute_unit_costs(
+            new_rows["单位"], new_rows["单位价格"], new_rows["单位容量"]
+        ).values
+        new_rows["创建时间"] = now
+        new_rows["修改时间"] = now
+        added = new_rows["编号"].tolist()
+        updated = pd.concat([updated, new_rows], ignore_index=True)
+
+    updated = updated[list(df.columns)]
+    summary = {"changed": changed, "added": added, "deleted": deleted}
+    return updated, summary
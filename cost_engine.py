@@ -0,0 +1,187 @@
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # optional: np.bincount does the same product without it
+    sparse = None
+
+
+def _float(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _floats(values, default):
+    """Float array from a list; None -> NaN, unparseable -> `default`."""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([np.nan if v is None else _float(v, default) for v in values], dtype=float)
+
+
+class CostMatrix:
+    """Sparse recipes × ingredient-serials quantity matrix over a recipe list.
+
+    Built once from the 食材 lists (one entry per line, in COO form: recipe
+    row, serial column, 用量); costing a whole menu against a price vector is
+    then a few array operations instead of a nested dict loop.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = recipes
+        self.lines = []
+        counts = []
+        for recipe in recipes:
+            items = recipe.get("食材", [])
+            self.lines.extend(items)
+            counts.append(len(items))
+        lines = self.lines
+
+        # Row = recipe, column = distinct 编号 (in first-seen order)
+        self._serial_pos = {}
+        self.cols = np.asarray(
+            [self._serial_pos.setdefault(ing.get("编号"), len(self._serial_pos)) for ing in lines], dtype=np.int64
+        )
+        self.serials = list(self._serial_pos)
+        self.rows = np.repeat(np.arange(len(recipes), dtype=np.int64), counts)
+        self.qty = _floats([ing.get("用量", 0) for ing in lines], 0.0)
+
+        # What the lines said before costing, to report changes (a missing
+        # key never matches, so it gets written)
+        self.old_subtotals = _floats([ing.get("小计", 0) for ing in lines], 0.0)
+        self.old_unit_prices = _floats([ing.get("单价", np.inf) for ing in lines], np.nan)
+        self.old_base_prices = _floats([ing.get("基础单位价格", np.inf) for ing in lines], np.nan)
+        self.sale_prices = _floats([r.get("售价", 0) for r in recipes], 0.0)
+        # 成本百分比 divides by this: a missing 售价 counts as 0 (percentage 0), never NaN
+        self._percent_base = np.nan_to_num(self.sale_prices, nan=0.0)
+        self._matrix = None
+
+    @property
+    def shape(self):
+        return (len(self.recipes), len(self.serials))
+
+    def price_vector(self, unit_prices):
+        """Prices aligned with `self.serials` (NaN where unknown) + a known-serial mask."""
+        known = np.fromiter((s in unit_prices for s in self.serials), dtype=bool, count=len(self.serials))
+        prices = np.fromiter(
+            (_float(unit_prices.get(s), np.nan) for s in self.serials), dtype=float, count=len(self.serials)
+        )
+        return prices, known
+
+    def matrix(self):
+        """The quantity matrix as scipy CSR (None without scipy)."""
+        if self._matrix is None and sparse is not None:
+            self._matrix = sparse.csr_matrix((self.qty, (self.rows, self.cols)), shape=self.shape)
+        return self._matrix
+
+    def totals(self, prices):
+        """Unrounded cost per recipe for a price vector, or for an
+        (ingredients × scenarios) price matrix at once. NaN prices count as 0."""
+        prices = np.nan_to_num(np.asarray(prices, dtype=float))
+        matrix = self.matrix()
+        if matrix is not None:
+            return matrix @ prices
+        n = len(self.recipes)
+        if prices.ndim == 1:
+            return np.bincount(self.rows, weights=self.qty * prices[self.cols], minlength=n)
+        return np.column_stack([
+            np.bincount(self.rows, weights=self.qty * prices[self.cols, k], minlength=n)
+            for k in range(prices.shape[1])
+        ])
+
+    def _cost(self, unit_prices):
+        prices, known = self.price_vector(unit_prices)
+        line_known = known[self.cols]
+        line_price = prices[self.cols]
+        raw = self.qty * line_price
+        priced = line_known & ~np.isnan(line_price) & (line_price != 0)
+
+        # Unknown ingredients (removed from the DB) keep their existing 小计
+        subtotals = np.where(priced, round_like_python(raw), 0.0)
+        subtotals = np.where(line_known, subtotals, self.old_subtotals)
+        # The matrix-vector product, summed in line order like the old loop
+        totals = np.bincount(self.rows, weights=subtotals, minlength=len(self.recipes))
+        return line_price, line_known, priced, raw, subtotals, totals
+
+    def recipe_costs(self, unit_prices):
+        """(总成本, 成本百分比) arrays per recipe, exactly as apply() would store
+        them, without touching the recipes."""
+        totals = self._cost(unit_prices)[-1]
+        sale = self._percent_base
+        costs = np.array([round(t, 2) for t in totals.tolist()])
+        percents = np.array([
+            round((t / s) * 100, 2) if s else 0 for t, s in zip(totals.tolist(), sale.tolist())
+        ])
+        return costs, percents
+
+    def apply(self, unit_prices, catalog_rows=None):
+        """Write the costs for `unit_prices` (编号 -> price or None) into the recipes.
+
+        Lines whose 编号 is in `unit_prices` get 单价 / 基础单位价格 / 小计 (and
+        总成本 if the line has one); other lines keep their 小计. Each recipe gets
+        总成本 (sum of the rounded 小计) and 成本百分比. Pass `catalog_rows`
+        (编号 -> row) to also refresh the ingredient names.
+        Returns the indices of recipes whose costs changed.
+        """
+        line_price, line_known, priced, raw, subtotals, totals = self._cost(unit_prices)
+
+        line_changed = line_known & ~(
+            _same(self.old_subtotals, subtotals)
+            & _same(self.old_unit_prices, line_price)
+            & _same(self.old_base_prices, line_price)
+        )
+        changed = set(self.rows[line_changed].tolist())
+
+        # --- Write back: only lines whose price moved (all priced lines when
+        # names are refreshed too) ---
+        write = line_known if catalog_rows is not None else line_changed
+        price_values = [unit_prices.get(s) for s in self.serials]
+        rows_of = catalog_rows.get if catalog_rows is not None else None
+        for ing, col, is_priced, subtotal, cost in zip(
+            np.asarray(self.lines, dtype=object)[write].tolist(),
+            self.cols[write].tolist(),
+            priced[write].tolist(),
+            subtotals[write].tolist(),
+            raw[write].tolist(),
+        ):
+            price = price_values[col]
+            ing["基础单位价格"] = price
+            ing["单价"] = price
+            ing["小计"] = subtotal if is_priced else 0
+            if "总成本" in ing:
+                ing["总成本"] = cost if is_priced else 0
+            if rows_of is not None:
+                row = rows_of(self.serials[col], {})
+                ing["食材英文名"] = row.get("食材英文名", ing.get("食材英文名", ""))
+                ing["食材中文名"] = row.get("食材中文名", ing.get("食材中文名", ""))
+
+        for i, (recipe, total, sale) in enumerate(zip(self.recipes, totals.tolist(), self._percent_base.tolist())):
+            cost = round(total, 2)
+            percent = round((total / sale) * 100, 2) if sale else 0
+            if recipe.get("总成本") != cost or recipe.get("成本百分比") != percent:
+                changed.add(i)
+            recipe["总成本"] = cost
+            recipe["成本百分比"] = percent
+        return sorted(changed)
+
+
+def _same(a, b):
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+def round_like_python(values, decimals=2):
+    """Vectorized round() that matches Python's round() exactly.
+
+    np.round scales by 10**decimals first, so it can disagree with Python on
+    values sitting (almost) exactly on a tie, e.g. 0.425. Only those few are
+    re-rounded with Python.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6 * np.maximum(1.0, np.abs(scaled))
+    for i in np.flatnonzero(near_tie):
+        out[i] = round(float(values[i]), decimals)
+    return out
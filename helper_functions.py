@@ -1,64 +1,49 @@
+import io
 import re
 from uuid import uuid4
 import os
 import uuid
 from PIL import Image
+from image_store import (
+    make_derivatives, stored_image_path, delete_image,
+    content_hash, find_image_by_hash, record_image_hash,
+)
 import streamlit as st
+from cost_engine import CostMatrix
+import numpy as np
 import pandas as pd
 
-def merge_ingredients_into_recipes(recipes, ingredient_csv_path="ingredients.csv"):
+def merge_ingredients_into_recipes(recipes, ingredient_csv_path="ingredients.csv", catalog=None):
     """
     Refresh each recipe’s ingredient info using the latest unit prices from ingredients.csv.
     This avoids having to re-run a sync script manually.
+    Pass `catalog` to price from another storage backend instead of the CSV.
     """
     if not recipes or len(recipes) == 0:
         return recipes
 
-    if not os.path.exists(ingredient_csv_path):
-        raise FileNotFoundError(f"Ingredient file not found: {ingredient_csv_path}")
+    if catalog is None:
+        from catalog import load_catalog
 
-    ingredients_df = pd.read_csv(ingredient_csv_path)
-    ingredients_df["基础单位价格"] = pd.to_numeric(ingredients_df["基础单位价格"], errors="coerce")
-    ingredient_map = {
-    row["编号"]: row.to_dict()
-    for _, row in ingredients_df.iterrows()
-}
+        # Shared, mtime-keyed cache: no CSV parse unless the file changed
+        catalog = load_catalog(ingredient_csv_path)
 
-    for recipe in recipes:
-        total_cost = 0
-        updated_ings = []
-
-        for ing in recipe.get("食材", []):
-            serial = ing.get("编号")
-            qty = float(ing.get("用量", 0))
-
-            ingredient = ingredient_map.get(serial)
-            if ingredient:
-                unit_price = compute_unit_cost(
-                    unit=ingredient.get("单位"),
-                    cost=ingredient.get("单位价格"),
-                    volume_str=ingredient.get("单位容量")
-                )
-                ing["基础单位价格"] = unit_price
-                ing["单价"] = unit_price
-                ing["小计"] = round(unit_price * qty, 2) if unit_price else 0
-                total_cost += ing["小计"]
-            else:
-                # Keep existing subtotal if ingredient was removed from DB
-                subtotal = ing.get("小计", 0)
-                total_cost += subtotal
-
-            updated_ings.append(ing)
-
-        recipe["食材"] = updated_ings
-        recipe["总成本"] = round(total_cost, 2)
+    # Priced once per catalog version by compute_unit_costs; lines whose
+    # ingredient was removed from the DB keep their existing 小计
+    CostMatrix(recipes).apply(catalog.unit_prices)
+    return recipes
 
-        try:
-            recipe["成本百分比"] = round((total_cost / float(recipe.get("售价", 0))) * 100, 2)
-        except:
-            recipe["成本百分比"] = 0
 
-    return recipes
+def recost_recipes(recipes, affected_ids, catalog, now):
+    """Refresh cost & names of the recipes in `affected_ids` from `catalog`.
+
+    Updates them in place (修改时间 = now) and returns the updated recipes.
+    """
+    updated = [r for r in recipes if r.get("编号") in affected_ids]
+    CostMatrix(updated).apply(catalog.unit_prices, catalog_rows=catalog.by_serial)
+    for recipe in updated:
+        recipe["修改时间"] = now
+    return updated
 
 
 def calculate_waste_item(ingredients: list) -> dict:
@@ -97,14 +82,31 @@ def clean_ingredient_df(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def render_recipe(recipe, index, recipes, save_recipes):
+def delete_recipe_images(recipe, images):
+    """Remove the uploads only `recipe` shows; uploads are deduplicated by
+    content, so one another recipe still uses (per the ImageIndex `images`) stays."""
+    rid = recipe.get("编号")
+    for name in images.keys_of(recipe):
+        if not images.recipes_using([name]) - {rid}:
+            delete_image(name)
+
+
+def render_recipe(recipe, index, recipes, save_recipes, delete_recipe=None, images=None):
+    """Render one recipe inside an expander.
+
+    When `delete_recipe` is given it is called with the recipe 编号 so the
+    storage layer can drop a single record instead of rewriting the list.
+    Pass the ImageIndex as `images` to also remove the recipe's unshared
+    images on delete (otherwise `maintenance.py gc-images` picks them up).
+    """
     key_suffix = recipe["编号"]
 
     # Try to display image (even if missing)
     image_name = recipe.get("主图")
     if image_name:
-        image_path = os.path.join("uploaded_images", image_name)
-        if os.path.exists(image_path):
+        # Smallest derivative that still fills the 200px preview
+        image_path = stored_image_path(image_name, 200)
+        if image_path:
             st.image(image_path, width=200, caption="主图预览")
         else:
             st.warning("⚠️ 找不到主图文件")
@@ -166,8 +168,8 @@ def render_recipe(recipe, index, recipes, save_recipes):
                 st.markdown(f"**步骤 {row_start + idx + 1}**")
                 img_name = step.get("图片名")
                 if img_name:
-                    step_img_path = os.path.join("uploaded_images", img_name)
-                    if os.path.exists(step_img_path):
+                    step_img_path = stored_image_path(img_name, 600)
+                    if step_img_path:
                         st.image(step_img_path, use_container_width=True)
                     else:
                         st.warning("⚠️ 找不到步骤图片")
@@ -190,13 +192,29 @@ def render_recipe(recipe, index, recipes, save_recipes):
         if st.session_state.confirm_delete_index == index:
             st.warning(f"你确定要删除菜谱 `{recipe['中文名']}` 吗？这将无法恢复。", icon="⚠️")
             if st.button("✅ 确认删除", key=f"confirm_delete_{key_suffix}"):
-                deleted_recipe = recipes.pop(index)
-                save_recipes(recipes)
+                recipes[:] = [r for r in recipes if r["编号"] != recipe["编号"]]
+                if images is not None:
+                    delete_recipe_images(recipe, images)
+                if delete_recipe is not None:
+                    delete_recipe(recipe["编号"])
+                else:
+                    save_recipes(recipes)
                 st.toast("已删除菜谱 ✅")
                 st.session_state.confirm_delete_index = None
                 st.rerun()
 
 
+# Fallback divisors that turn a per-unit price into a per-g/ml price
+UNIT_BASE_FACTORS = {
+    "kg": 1000,
+    "公斤": 1000,
+    "斤": 500,
+    "l": 1000,
+    "g": 1,
+    "ml": 1,
+}
+
+
 def compute_unit_cost(unit, cost, volume_str):
     try:
         # Normalize and clean cost
@@ -215,45 +233,109 @@ def compute_unit_cost(unit, cost, volume_str):
         unit = str(unit).strip().lower()
 
         # Fallback logic if no valid volume
-        if unit in ["kg", "公斤"]:
-            return round(cost / 1000, 4)
-        elif unit == "斤":
-            return round(cost / 500, 4)
-        elif unit == "l":
-            return round(cost / 1000, 4)
-        elif unit in ["g", "ml"]:
-            return round(cost, 4)
-        else:
+        factor = UNIT_BASE_FACTORS.get(unit)
+        if factor is None:
             return None  # unknown units
+        return round(cost / factor, 4)
     except Exception as e:
         print(f"⚠️ Error computing unit cost: {e}, cost={cost}, volume_str={volume_str}, unit={unit}")
         return None
+
+
+def compute_unit_costs(units, costs, volumes):
+    """Column-wise compute_unit_cost for whole 单位 / 单位价格 / 单位容量 columns.
+
+    Returns a float Series of 基础单位价格 aligned with `costs`. Rows where the
+    scalar version returns None (unknown unit, unparseable cost) come back as
+    NaN, which is exactly what `df.apply(compute_unit_cost, axis=1)` produced.
+    """
+    costs = pd.Series(costs)
+    index = costs.index
+    # Align positionally, not by label
+    units = pd.Series(np.asarray(units, dtype=object), index=index)
+    volumes = pd.Series(np.asarray(volumes), index=index)
+
+    # Normalize and clean cost (already-numeric columns skip the string pass)
+    if pd.api.types.is_numeric_dtype(costs):
+        cost = costs.astype(float)
+    else:
+        cost = pd.to_numeric(
+            costs.astype(str)
+            .str.replace("¥", "", regex=False)
+            .str.replace("$", "", regex=False)
+            .str.replace(",", "", regex=False)
+            .str.strip(),
+            errors="coerce",
+        )
+
+    # Volume-based price wins wherever the volume is a positive number
+    if pd.api.types.is_numeric_dtype(volumes):
+        volume = volumes.astype(float)
+    else:
+        volume = pd.to_numeric(volumes.astype(str).str.strip(), errors="coerce")
+    by_volume = cost / volume.where(volume > 0)
+
+    # Fallback: unit-factor lookup, NaN for unknown units
+    factor = units.astype(str).str.strip().str.lower().map(UNIT_BASE_FACTORS).astype(float)
+    by_unit = cost / factor
+
+    raw = by_volume.fillna(by_unit)
+    # Python's round() rather than Series.round(): numpy rounds ties differently
+    # (e.g. 0.42625), and results must match compute_unit_cost exactly
+    return pd.Series([round(x, 4) for x in raw.tolist()], index=index, dtype=float)
   
     
-def save_uploaded_file(uploaded_file, filename_hint=None):
+def save_uploaded_file(uploaded_file, filename_hint=None, with_status=False):
+    """Store an uploaded image and return its filename.
+
+    Uploads are keyed by content hash: if the same bytes were stored before
+    (by any recipe or step) that file is reused without decoding the image.
+    With `with_status=True` returns `(filename, cache_hit)`.
+    """
     upload_dir = "uploaded_images"
     os.makedirs(upload_dir, exist_ok=True)
 
+    data = uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read()
+    digest = content_hash(data)
+
+    existing = find_image_by_hash(digest, upload_dir)
+    if existing:
+        try:
+            # Counts as a fresh upload for the gc-images grace period: the
+            # file may be an orphan that this draft is about to use again
+            os.utime(os.path.join(upload_dir, existing))
+            return (existing, True) if with_status else existing
+        except FileNotFoundError:
+            pass  # collected in between; store it again below
+
     ext = os.path.splitext(uploaded_file.name)[-1].lower()
     
-    # Sanitize the filename hint
+    # Sanitize the filename hint; the hash suffix keeps a new image from
+    # overwriting a file another recipe may be sharing
     if filename_hint:
         safe_name = "".join(c if c.isalnum() or c in ("_", "-") else "_" for c in filename_hint)
-        unique_filename = f"{safe_name}{ext}"
+        unique_filename = f"{safe_name}_{digest[:12]}{ext}"
     else:
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
+        unique_filename = f"{digest[:32]}{ext}"
         
     file_path = os.path.join(upload_dir, unique_filename)
 
     # Save and resize
-    img = Image.open(uploaded_file)
+    img = Image.open(io.BytesIO(data))
     img.thumbnail((1024, 1024))  # Adjust size as needed
     img.save(file_path)
 
-    return unique_filename
+    # Smaller display copies (WebP + original format) for the render helpers
+    try:
+        make_derivatives(unique_filename, upload_dir, img, digest=digest)
+    except OSError as e:
+        print(f"⚠️ Could not create image derivatives for {unique_filename}: {e}")
+        record_image_hash(unique_filename, digest, upload_dir)
+
+    return (unique_filename, False) if with_status else unique_filename
 
 
-def display_recipe(recipe):
+def display_recipe(recipe, delete_recipe=None, images=None):
     key_suffix = recipe["编号"]
     skuid = recipe.get("SKUID") or "N/A"
     label = f"{recipe['中文名']} / {recipe['英文名']} — SKUID: {skuid} — 售价: ¥{recipe['售价']}"
@@ -299,23 +381,17 @@ def display_recipe(recipe):
             if st.session_state.confirm_delete_index == key_suffix:
                 st.warning(f"你确定要删除菜谱 `{recipe['中文名']}` 吗？这将无法恢复。", icon="⚠️")
                 if st.button("✅ 确认删除", key=f"confirm_delete_{key_suffix}"):
-                    recipes[:] = [r for r in recipes if r["编号"] != recipe["编号"]]
-
-                    # Remove associated images
-                    main_img = recipe.get("主图", "")
-                    if main_img:
-                        main_img_path = os.path.join("uploaded_images", main_img)
-                        if os.path.exists(main_img_path):
-                            os.remove(main_img_path)
-
-                    for step in recipe.get("步骤", []):
-                        step_img = step.get("图片名", "")
-                        if step_img:
-                            step_img_path = os.path.join("uploaded_images", step_img)
-                            if os.path.exists(step_img_path):
-                                os.remove(step_img_path)
+                    if delete_recipe is None:
+                        recipes[:] = [r for r in recipes if r["编号"] != recipe["编号"]]
 
-                    save_recipes(recipes)
+                    # Remove associated images other recipes don't share
+                    if images is not None:
+                        delete_recipe_images(recipe, images)
+
+                    if delete_recipe is not None:
+                        delete_recipe(recipe["编号"])  # journaled, no full rewrite
+                    else:
+                        save_recipes(recipes)
                     st.toast("已删除菜谱 ✅")
                     st.session_state.confirm_delete_index = None
                     st.rerun()
@@ -0,0 +1,15 @@
+import sys
+import os
+sys.path.append(os.path.abspath(".."))
+from image_store import backfill_derivatives  # same pipeline as new uploads
+
+# Folder with the uploaded recipe images
+UPLOAD_DIR = "../uploaded_images"
+
+# Pass --force to regenerate derivatives that already exist
+force = "--force" in sys.argv[1:]
+
+done = backfill_derivatives(UPLOAD_DIR, force=force)
+for name in done:
+    print(f"🖼️ {name}")
+print(f"✅ Created derivatives for {len(done)} images in {UPLOAD_DIR}")
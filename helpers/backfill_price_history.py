@@ -0,0 +1,40 @@
+import sqlite3
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(".."))
+import pandas as pd
+from backup_store import extract_file, list_snapshots
+from catalog import load_catalog
+from helper_functions import clean_ingredient_df
+from price_history import record_prices
+
+# File paths
+INGREDIENT_FILE = "../ingredients.csv"
+BACKUP_DIR = "../backups"
+HISTORY_FILE = "../price_history.csv"
+
+# Rebuild the price history from the backups: every snapshot's ingredients
+# are recorded at their 修改时间. Safe to re-run, known prices are skipped.
+tmp_dir = tempfile.mkdtemp()
+added = 0
+for snap in list_snapshots(BACKUP_DIR):
+    if "ingredients" in snap["files"]:
+        path = os.path.join(tmp_dir, "ingredients.csv")
+        extract_file(snap, "ingredients", path, BACKUP_DIR)
+        df = clean_ingredient_df(pd.read_csv(path))
+    elif "db" in snap["files"]:
+        path = os.path.join(tmp_dir, "recipes.db")
+        extract_file(snap, "db", path, BACKUP_DIR)
+        with sqlite3.connect(path) as conn:
+            df = clean_ingredient_df(pd.read_sql_query("SELECT * FROM ingredients", conn))
+    else:
+        continue
+    n = record_prices(df, HISTORY_FILE)
+    added += n
+    print(f"📦 {snap['timestamp']}: {n} prices")
+
+# And the current prices
+if os.path.exists(INGREDIENT_FILE):
+    added += record_prices(load_catalog(INGREDIENT_FILE).df, HISTORY_FILE)
+print(f"✅ Added {added} rows to {HISTORY_FILE}")
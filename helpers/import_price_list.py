@@ -0,0 +1,46 @@
+import argparse
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.abspath(".."))
+from helper_functions import recost_recipes
+from price_import import import_price_list, read_price_list
+from storage import FileStorage
+
+# File paths
+INGREDIENT_FILE = "../ingredients.csv"
+RECIPE_FILE = "../recipes.json"
+BACKUP_DIR = "../backups"
+
+# Weekly supplier price list -> ingredients.csv (+ recost recipes that use changed items)
+# usage: python import_price_list.py prices.xlsx [--dry-run]
+parser = argparse.ArgumentParser(description="Import a supplier price list (CSV/XLSX)")
+parser.add_argument("price_list")
+parser.add_argument("--dry-run", action="store_true", help="only print what would change")
+args = parser.parse_args()
+
+storage = FileStorage(INGREDIENT_FILE, RECIPE_FILE, BACKUP_DIR)
+df = storage.load_catalog().df
+now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+df_updated, summary = import_price_list(df, read_price_list(args.price_list), now)
+updated, added = summary["updated"], summary["added"]
+print(
+    f"📋 更新 {len(updated)} 行，新增 {len(added)} 行，"
+    f"未变 {summary['unchanged']} 行，跳过 {summary['skipped']} 行"
+)
+
+if args.dry_run or not (updated or added):
+    sys.exit(0)
+
+storage.backup(datetime.now().strftime("%Y%m%d_%H%M%S"))
+storage.save_ingredients(df_updated, set(updated) | set(added))
+print(f"✅ Saved {INGREDIENT_FILE}")
+
+# Only recipes using a repriced ingredient need new costs
+recipes = storage.load_recipes()
+affected_ids = storage.ingredient_index(recipes).recipes_using(updated)
+updated_recipes = recost_recipes(recipes, affected_ids, storage.load_catalog(), now)
+if updated_recipes:
+    storage.upsert_recipes(updated_recipes)
+    print(f"🔁 Updated cost of {len(updated_recipes)} recipes")
@@ -0,0 +1,15 @@
+import sys
+import os
+sys.path.append(os.path.abspath(".."))
+from storage import SqliteStorage  # reuse the app's storage layer
+
+# File paths
+INGREDIENT_FILE = "../ingredients.csv"
+RECIPE_FILE = "../recipes.json"
+DB_FILE = "../recipes.db"
+
+# One-shot migration: copy ingredients.csv + recipes.json into recipes.db.
+# Afterwards run the app with RECIPE_APP_STORAGE=sqlite to use it.
+db = SqliteStorage(DB_FILE)
+n_ing, n_rec = db.import_files(INGREDIENT_FILE, RECIPE_FILE)
+print(f"✅ Imported {n_ing} ingredients and {n_rec} recipes into {DB_FILE}")
@@ -0,0 +1,39 @@
+import argparse
+import sys
+import os
+sys.path.append(os.path.abspath(".."))
+from backup_store import list_snapshots, prune
+from storage import FileStorage, SqliteStorage, STORAGE_ENV, DB_ENV, DB_FILE
+
+# File paths
+INGREDIENT_FILE = "../ingredients.csv"
+RECIPE_FILE = "../recipes.json"
+BACKUP_DIR = "../backups"
+
+# usage:
+#   python restore_backup.py --list
+#   python restore_backup.py 20250801_120000   (latest backup at or before that time)
+#   python restore_backup.py --prune
+parser = argparse.ArgumentParser(description="List, restore or prune backups")
+parser.add_argument("timestamp", nargs="?", help="YYYYmmdd_HHMMSS; restores the latest backup at or before it")
+parser.add_argument("--list", action="store_true")
+parser.add_argument("--prune", action="store_true", help="apply the retention policy now")
+args = parser.parse_args()
+
+if args.list or not (args.timestamp or args.prune):
+    for snap in list_snapshots(BACKUP_DIR):
+        files = ", ".join(f"{label} {f['size'] / 1024:.0f}KB" for label, f in snap["files"].items())
+        print(f"{snap['timestamp']}  {files}")
+    sys.exit(0)
+
+if args.prune:
+    print(f"🧹 Removed {prune(BACKUP_DIR)} old backups")
+    sys.exit(0)
+
+if os.environ.get(STORAGE_ENV, "file").lower() == "sqlite":
+    storage = SqliteStorage(os.path.join("..", os.environ.get(DB_ENV, DB_FILE)), BACKUP_DIR)
+else:
+    storage = FileStorage(INGREDIENT_FILE, RECIPE_FILE, BACKUP_DIR)
+
+snap = storage.restore(args.timestamp)
+print(f"✅ Restored backup {snap['timestamp']} (the previous state was backed up first)")
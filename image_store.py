@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from PIL import Image
+
+UPLOAD_DIR = "uploaded_images"
+DERIVATIVE_DIR = "_derivatives"  # inside UPLOAD_DIR
+MANIFEST_FILE = "manifest.json"  # inside UPLOAD_DIR
+
+# Display widths we generate; each one is stored as WebP and in the original format
+DERIVATIVE_WIDTHS = (200, 600, 1024)
+WEBP_QUALITY = 80
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+_MANIFEST_CACHE = {}  # manifest path -> (mtime_ns, dict)
+_HASH_INDEX_CACHE = {}  # manifest path -> (manifest dict, {sha256: image name})
+_MANIFEST_LOCK = threading.Lock()
+_LISTING_CACHE = {}  # upload dir -> (dir mtimes, set of stored relative names)
+
+# Unreferenced uploads younger than this are kept: Add Recipe stores the
+# image before the recipe itself is saved
+GC_GRACE_SECONDS = 24 * 3600
+
+
+def _manifest_path(upload_dir):
+    return os.path.join(upload_dir, MANIFEST_FILE)
+
+
+def load_manifest(upload_dir=UPLOAD_DIR):
+    """image name -> {"width", "height", "derivatives": {width: {"webp", "original"}}}.
+
+    Cached per manifest mtime, so render paths don't re-read it every rerun.
+    """
+    path = _manifest_path(upload_dir)
+    if not os.path.exists(path):
+        return {}
+    mtime = os.stat(path).st_mtime_ns
+    with _MANIFEST_LOCK:
+        cached = _MANIFEST_CACHE.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    with _MANIFEST_LOCK:
+        _MANIFEST_CACHE[path] = (mtime, manifest)
+    return manifest
+
+
+def _update_manifest(upload_dir, updates=None, removals=()):
+    path = _manifest_path(upload_dir)
+    with _MANIFEST_LOCK:
+        manifest = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        manifest.update(updates or {})
+        for name in removals:
+            manifest.pop(name, None)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+        _MANIFEST_CACHE[path] = (os.stat(path).st_mtime_ns, manifest)
+    return manifest
+
+
+def _save_variant(img, path, fmt):
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    if fmt == "WEBP":
+        img.save(path, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        img.save(path, fmt)
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_image_by_hash(digest, upload_dir=UPLOAD_DIR):
+    """Name of an already stored upload with this content hash, or None."""
+    manifest = load_manifest(upload_dir)
+    path = _manifest_path(upload_dir)
+    with _MANIFEST_LOCK:
+        cached = _HASH_INDEX_CACHE.get(path)
+        if cached is None or cached[0] is not manifest:
+            by_hash = {
+                entry["sha256"]: name for name, entry in manifest.items() if entry.get("sha256")
+            }
+            cached = (manifest, by_hash)
+            _HASH_INDEX_CACHE[path] = cached
+    name = cached[1].get(digest)
+    if name and os.path.exists(os.path.join(upload_dir, name)):
+        return name
+    return None
+
+
+def record_image_hash(image_name, digest, upload_dir=UPLOAD_DIR):
+    """Store the content hash for an image (used when derivatives could not be made)."""
+    entry = dict(load_manifest(upload_dir).get(image_name, {}))
+    entry["sha256"] = digest
+    _update_manifest(upload_dir, {image_name: entry})
+
+
+def make_derivatives(image_name, upload_dir=UPLOAD_DIR, img=None, digest=None):
+    """Write the resized copies of one uploaded image and record them in the manifest.
+
+    Widths at or above the original's width are skipped; the original serves those.
+    `digest` is the content hash of the upload; when omitted the stored file is hashed.
+    """
+    src_path = os.path.join(upload_dir, image_name)
+    if img is None:
+        img = Image.open(src_path)
+    img.load()
+    stem, ext = os.path.splitext(image_name)
+    # Same rule as img.save(path): the extension decides the format
+    fmt = Image.registered_extensions().get(ext.lower()) or img.format or "PNG"
+    out_dir = os.path.join(upload_dir, DERIVATIVE_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    derivatives = {}
+    for width in DERIVATIVE_WIDTHS:
+        if width >= img.width:
+            continue
+        height = max(1, round(img.height * width / img.width))
+        resized = img.resize((width, height), Image.LANCZOS)
+        webp_name = f"{DERIVATIVE_DIR}/{stem}_{width}.webp"
+        orig_name = f"{DERIVATIVE_DIR}/{stem}_{width}{ext}"
+        _save_variant(resized, os.path.join(upload_dir, webp_name), "WEBP")
+        _save_variant(resized, os.path.join(upload_dir, orig_name), fmt)
+        derivatives[str(width)] = {"webp": webp_name, "original": orig_name}
+
+    if digest is None:
+        with open(src_path, "rb") as f:
+            digest = content_hash(f.read())
+    entry = {"width": img.width, "height": img.height, "derivatives": derivatives, "sha256": digest}
+    _update_manifest(upload_dir, {image_name: entry})
+    return entry
+
+
+def _variant_name(image_name, width, upload_dir, prefer_webp):
+    entry = load_manifest(upload_dir).get(image_name)
+    if entry and width:
+        sizes = sorted(int(w) for w in entry.get("derivatives", {}))
+        for size in sizes:
+            if size >= width:
+                return entry["derivatives"][str(size)]["webp" if prefer_webp else "original"]
+    return image_name
+
+
+def image_path_for_width(image_name, width, upload_dir=UPLOAD_DIR, prefer_webp=True):
+    """Path of the smallest stored variant at least `width` px wide.
+
+    Falls back to the original file when no derivative is large enough or the
+    image has no manifest entry yet.
+    """
+    return os.path.join(upload_dir, _variant_name(image_name, width, upload_dir, prefer_webp))
+
+
+def stored_files(upload_dir=UPLOAD_DIR):
+    """Names of the files in `upload_dir` and its derivative folder ("_derivatives/x.webp").
+
+    Cached per directory mtime (adding or removing a file bumps it), so
+    checking N images costs two stat calls instead of N.
+    """
+    derivative_dir = os.path.join(upload_dir, DERIVATIVE_DIR)
+    signature = tuple(
+        os.stat(d).st_mtime_ns if os.path.isdir(d) else None for d in (upload_dir, derivative_dir)
+    )
+    with _MANIFEST_LOCK:
+        cached = _LISTING_CACHE.get(upload_dir)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    names = set()
+    if signature[0] is not None:
+        names = {e.name for e in os.scandir(upload_dir) if e.is_file()}
+    if signature[1] is not None:
+        names |= {f"{DERIVATIVE_DIR}/{e.name}" for e in os.scandir(derivative_dir) if e.is_file()}
+    with _MANIFEST_LOCK:
+        _LISTING_CACHE[upload_dir] = (signature, names)
+    return names
+
+
+def stored_image_path(image_name, width, upload_dir=UPLOAD_DIR, prefer_webp=True):
+    """image_path_for_width(), or None when that file isn't on disk."""
+    name = _variant_name(image_name, width, upload_dir, prefer_webp)
+    if name not in stored_files(upload_dir):
+        return None
+    return os.path.join(upload_dir, name)
+
+
+def delete_image(image_name, upload_dir=UPLOAD_DIR):
+    """Remove an uploaded image together with its derivatives and manifest entry."""
+    entry = load_manifest(upload_dir).get(image_name, {})
+    paths = [os.path.join(upload_dir, image_name)]
+    for variant in entry.get("derivatives", {}).values():
+        paths += [os.path.join(upload_dir, p) for p in variant.values()]
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+    if entry:
+        _update_manifest(upload_dir, removals=[image_name])
+
+
+def backfill_derivatives(upload_dir=UPLOAD_DIR, force=False):
+    """Create derivatives for uploads that have no manifest entry. Returns names processed."""
+    manifest = load_manifest(upload_dir)
+    done = []
+    for name in sorted(os.listdir(upload_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        if name in manifest and not force:
+            continue
+        try:
+            make_derivatives(name, upload_dir)
+            done.append(name)
+        except OSError as e:
+            print(f"⚠️ Could not process {name}: {e}")
+    return done
+
+
+def collect_garbage(referenced, upload_dir=UPLOAD_DIR, grace_seconds=GC_GRACE_SECONDS, dry_run=False, now=None):
+    """Delete uploads no recipe references, with their derivatives and manifest entries.
+
+    `referenced` is anything supporting `in` on image names (an ImageIndex).
+    Files modified within `grace_seconds` are kept; manifest entries whose
+    original is already gone and derivative files no manifest entry lists
+    are cleaned up too. Returns {"images", "derivatives", "bytes"}.
+    """
+    if not os.path.isdir(upload_dir):
+        return {"images": [], "derivatives": [], "bytes": 0}
+    cutoff = (time.time() if now is None else now) - grace_seconds
+
+    def old_enough(path):
+        return os.stat(path).st_mtime < cutoff
+
+    def size(name):
+        path = os.path.join(upload_dir, name)
+        return os.stat(path).st_size if os.path.exists(path) else 0
+
+    manifest = load_manifest(upload_dir)
+    files = stored_files(upload_dir)
+    originals = {n for n in files if "/" not in n and n.lower().endswith(IMAGE_EXTENSIONS)}
+
+    images = sorted(
+        n for n in originals
+        if n not in referenced and old_enough(os.path.join(upload_dir, n))
+    )
+    images += sorted(n for n in manifest if n not in originals and n not in referenced)
+
+    doomed = set(images)
+
+    def variants(names):
+        return {
+            p for name in names
+            for variant in manifest.get(name, {}).get("derivatives", {}).values() for p in variant.values()
+        }
+
+    kept, going = variants(set(manifest) - doomed), variants(doomed)
+    # Derivatives go with their image; ones no manifest entry lists get the grace period
+    derivatives = sorted(
+        n for n in files
+        if n.startswith(DERIVATIVE_DIR + "/") and n not in kept
+        and (n in going or old_enough(os.path.join(upload_dir, n)))
+    )
+    freed = sum(size(n) for n in images) + sum(size(n) for n in derivatives)
+
+    if not dry_run:
+        for name in images:
+            delete_image(name, upload_dir)
+        for name in derivatives:
+            path = os.path.join(upload_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+    return {"images": images, "derivatives": derivatives, "bytes": freed}
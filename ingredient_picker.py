@@ -0,0 +1,57 @@
+from catalog import cached_per_version
+from search_index import get_search_index
+
+# Process-wide cache: catalog version -> IngredientPicker
+_PICKER_CACHE = {}
+MAX_CACHED_PICKERS = 4
+
+
+class IngredientPicker:
+    """What the Add Recipe ingredient picker needs, built once per catalog version.
+
+    `labels` maps 编号 -> "食材中文名 (编号)", `by_category` 食材分类 -> 编号s
+    in catalog order and `records` 编号 -> row; typeahead goes through the
+    catalog's SearchIndex.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.records = catalog.by_serial
+        # Read-only, so the typed frame: missing names / 分类 are NaN, not ""
+        df = catalog.typed
+        df = df[df["编号"].notna()]
+        serials = df["编号"].tolist()
+        names = df["食材中文名"].fillna("").tolist()
+        self.labels = {serial: f"{name} ({serial})" for serial, name in zip(serials, names)}
+        categories = df["食材分类"].astype(object)
+        self.category_of = dict(zip(serials, categories.where(categories.notna(), None).tolist()))
+
+        self.all = list(dict.fromkeys(serials))
+        self.by_category = {}
+        for serial in self.all:
+            self.by_category.setdefault(self.category_of[serial], []).append(serial)
+        self.categories = sorted(c for c in self.by_category if c is not None)
+
+    def label(self, serial):
+        return self.labels.get(serial, serial)
+
+    def options(self, category="", query=""):
+        """编号s to offer: one category (or all), ranked by `query` when given."""
+        if not query.strip():
+            return self.by_category.get(category, []) if category else self.all
+        hits = get_search_index(self.catalog).search(query)
+        if category:
+            hits = [s for s in hits if self.category_of.get(s) == category]
+        return hits
+
+    def unit_price(self, serial):
+        """Computed 基础单位价格 (what the cost engine uses), else the stored one."""
+        price = self.catalog.unit_prices.get(serial)
+        if price is None:
+            price = self.records.get(serial, {}).get("基础单位价格")
+        return price
+
+
+def get_ingredient_picker(catalog):
+    """IngredientPicker for a Catalog, rebuilt only when the catalog version changes."""
+    return cached_per_version(catalog, IngredientPicker, _PICKER_CACHE, MAX_CACHED_PICKERS)
@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from catalog import DATA_FILE, TIMESTAMP_FORMAT, allocate_serials, cells_differ
+from cost_engine import CostMatrix
+from helper_functions import compute_unit_costs
+from image_store import GC_GRACE_SECONDS, UPLOAD_DIR, collect_garbage
+from recipe_store import RECIPE_FILE
+from storage import BACKUP_DIR, STORE_DIR, STORAGE_ENV, FileStorage, get_storage
+
+# One pass over the data files instead of the separate helpers/ scripts:
+#   python maintenance.py all --dry-run
+#   python maintenance.py assign-serials recost-ingredients
+#   python maintenance.py gc-images --dry-run --grace-hours 48
+#   python maintenance.py all --storage sqlite
+# Steps always run in STEPS order, on data loaded once; only files that
+# actually changed are written. gc-images deletes files, so "all" leaves
+# it out; it runs last, against the recipes as saved.
+STEPS = ["assign-serials", "recost-ingredients", "recost-recipes"]
+EXPLICIT_STEPS = ["gc-images"]
+
+REPORT_LIMIT = 20  # 编号s listed per step in the report
+
+
+class Pipeline:
+    """Ingredients + recipes held in memory while the steps run."""
+
+    def __init__(self, storage, now, upload_dir=UPLOAD_DIR, grace_seconds=GC_GRACE_SECONDS):
+        self.storage = storage
+        self.now = now
+        self.upload_dir = upload_dir
+        self.grace_seconds = grace_seconds
+        self.original = storage.load_catalog().df
+        self.df = self.original.copy()  # the catalog frame is shared; never mutate it
+        self.recipes = storage.load_recipes()
+        self.changed_recipes = set()
+        self.collect_images = False
+        self.report = {}
+
+    def assign_serials(self):
+        """Give rows without a valid, unique 编号 the next one for their category."""
+        serials = self.df["编号"].fillna("").astype(str).str.strip()
+        missing = (serials == "") | serials.duplicated(keep="first")
+        if missing.any():
+            new = allocate_serials(serials[~missing], self.df.loc[missing, "食材分类"])
+            self.df.loc[missing, "编号"] = new
+            for col in ("创建时间", "修改时间"):
+                blank = missing & (self.df[col].fillna("") == "")
+                self.df.loc[blank, col] = self.now
+        self.report["assign-serials"] = self.df.loc[missing, "编号"].tolist()
+
+    def recost_ingredients(self):
+        """Recompute 基础单位价格 from 单位 / 单位价格 / 单位容量."""
+        costs = compute_unit_costs(self.df["单位"], self.df["单位价格"], self.df["单位容量"])
+        changed = cells_differ(self.df["基础单位价格"], costs)
+        self.df.loc[changed, "基础单位价格"] = costs[changed]
+        self.report["recost-ingredients"] = self.df.loc[changed, "编号"].tolist()
+
+    def recost_recipes(self):
+        """Reprice every recipe line from the in-memory catalog."""
+        prices = compute_unit_costs(self.df["单位"], self.df["单位价格"], self.df["单位容量"])
+        unit_prices = {
+            serial: (None if price != price else price)  # NaN -> None, like Catalog.unit_prices
+            for serial, price in zip(self.df["编号"].tolist(), prices.tolist())
+        }
+        matrix = CostMatrix(self.recipes)
+        missing = [s for s in matrix.serials if s not in unit_prices and s != "WASTE"]
+        for serial in missing:
+            print(f"⚠️ 编号 {serial} not found in ingredients — keeping its stored 小计")
+        changed = matrix.apply(unit_prices)
+        for i in changed:
+            self.recipes[i]["修改时间"] = self.now
+        self.changed_recipes.update(changed)
+        self.report["recost-recipes"] = [self.recipes[i].get("编号") for i in changed]
+
+    def gc_images(self):
+        """Uploads (and derivatives) no recipe references, past the grace period."""
+        found = collect_garbage(
+            self.storage.image_index(self.recipes), self.upload_dir, self.grace_seconds, dry_run=True
+        )
+        self.collect_images = bool(found["images"] or found["derivatives"])
+        self.report["gc-images"] = found["images"] + found["derivatives"]
+        self.report["gc-images bytes"] = found["bytes"]
+
+    def run(self, steps):
+        for step in STEPS + EXPLICIT_STEPS:
+            if step in steps:
+                getattr(self, step.replace("-", "_"))()
+
+    def ingredients_changed(self):
+        return not self.df.equals(self.original)
+
+    def _location(self, attr):
+        # File paths for the file backend, the database for SQLite
+        return getattr(self.storage, attr, None) or getattr(self.storage, "db_path", self.storage.name)
+
+    def save(self):
+        """Write what changed; returns the list of files written."""
+        written = []
+        if self.ingredients_changed():
+            serials = set(self.report.get("assign-serials", [])) | set(self.report.get("recost-ingredients", []))
+            self.storage.save_ingredients(self.df, serials)
+            written.append(self._location("ingredient_path"))
+        if self.changed_recipes:
+            # Journaled upserts: only the changed recipes are written
+            self.storage.upsert_recipes([self.recipes[i] for i in sorted(self.changed_recipes)])
+            written.append(self._location("recipe_path"))
+        if self.collect_images:
+            collect_garbage(self.storage.image_index(self.recipes), self.upload_dir, self.grace_seconds)
+            written.append(self.upload_dir)
+        return written
+
+
+def print_report(report):
+    for step in STEPS + EXPLICIT_STEPS:
+        if step not in report:
+            continue
+        items = report[step]
+        shown = ", ".join(str(s) for s in items[:REPORT_LIMIT])
+        more = f" … (+{len(items) - REPORT_LIMIT})" if len(items) > REPORT_LIMIT else ""
+        verb = f"removed ({report[step + ' bytes'] / 1024:.0f} KB)" if step == "gc-images" else "changed"
+        print(f"  {step:<20} {len(items):>6} {verb}" + (f": {shown}{more}" if items else ""))
+
+
+def main(argv=None, ingredient_path=DATA_FILE, recipe_path=RECIPE_FILE, upload_dir=None):
+    parser = argparse.ArgumentParser(description="Maintenance steps for the ingredient / recipe data")
+    parser.add_argument("steps", nargs="+", choices=STEPS + EXPLICIT_STEPS + ["all"])
+    parser.add_argument("--dry-run", action="store_true", help="report the changes without writing")
+    parser.add_argument("--storage", help='"file" or "sqlite" (default: RECIPE_APP_STORAGE or file)')
+    parser.add_argument("--ingredients", default=ingredient_path, help="file backend only")
+    parser.add_argument("--recipes", default=recipe_path, help="file backend only")
+    parser.add_argument("--images", default=upload_dir,
+                        help="upload folder for gc-images (default: next to --ingredients)")
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE_SECONDS / 3600,
+                        help="gc-images keeps unreferenced uploads younger than this")
+    args = parser.parse_args(argv)
+    steps = set(args.steps)
+    if "all" in steps:
+        steps |= set(STEPS)
+
+    kind = (args.storage or os.environ.get(STORAGE_ENV, "file")).lower()
+    # Everything else lives beside the ingredient file, not in the cwd
+    # (the helpers/ shims run from helpers/ and pass "../" paths)
+    data_dir = os.path.dirname(args.ingredients)
+    if args.images is None:
+        args.images = os.path.join(data_dir, UPLOAD_DIR)
+    if kind == "file":
+        storage = FileStorage(
+            args.ingredients, args.recipes, os.path.join(data_dir, BACKUP_DIR),
+            store_dir=os.path.join(data_dir, STORE_DIR),
+        )
+    else:
+        storage = get_storage(kind)
+    pipeline = Pipeline(
+        storage, datetime.now().strftime(TIMESTAMP_FORMAT), args.images, args.grace_hours * 3600
+    )
+    pipeline.run(steps)
+
+    print("📋 Dry run, nothing written:" if args.dry_run else "📋 Changes:")
+    print_report(pipeline.report)
+    if args.dry_run:
+        return 0
+
+    written = pipeline.save()
+    if written:
+        print(f"✅ Saved {', '.join(written)}")
+    else:
+        print("✅ Everything up to date, no files written")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
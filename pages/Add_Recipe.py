@@ -3,6 +3,10 @@ import pandas as pd
 from datetime import datetime
 import os, json
 from helper_functions import save_uploaded_file
+from image_store import stored_image_path
+from ingredient_picker import get_ingredient_picker
+from storage import get_storage
+from profiling import timed
 
 # --- INITIALIZE STATE ---
 if "edit_mode" not in st.session_state:
@@ -49,11 +53,9 @@ if st.session_state.get("mode") == "edit":
         st.rerun()
 
 # --- LOAD DATABASES ---
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-ING_FILE = os.path.join(BASE_DIR, "ingredients.csv")
-REC_FILE = os.path.join(BASE_DIR, "recipes.json")
-df_ing = pd.read_csv(ING_FILE)
-df_ing["基础单位价格"] = pd.to_numeric(df_ing["基础单位价格"], errors="coerce")
+storage = get_storage()
+with timed("load"):
+    catalog = storage.load_catalog()
 
 # --- RECIPE INFO ---
 col1, col2 = st.columns(2)
@@ -78,38 +80,48 @@ with col2:
     # Use existing image if editing
     main_img = recipe["主图"] if recipe else ""
 
-    # Save new uploaded image
+    # Save new uploaded image once per upload; later reruns would find the
+    # file this upload just stored and look like a reuse
     if img:
         if name_en.strip():
-            main_img = save_uploaded_file(img, f"{name_en.strip()}_main")
+            stored = st.session_state.get("main_img_upload")
+            if stored is None or stored[0] != img.file_id:
+                with timed("upload"):
+                    name, reused = save_uploaded_file(img, f"{name_en.strip()}_main", with_status=True)
+                stored = st.session_state.main_img_upload = (img.file_id, name, reused)
+            _, main_img, reused = stored
+            if reused:
+                st.caption("♻️ 相同图片已存在，直接复用")
         else:
             st.warning("请输入英文名后再上传图片")
 
     # Display preview if there's a main image path
     if main_img:
-        img_path = os.path.join("uploaded_images", main_img)
-        if os.path.exists(img_path):
+        img_path = stored_image_path(main_img, 250)
+        if img_path:
             st.image(img_path, width=250, caption="主图预览")
         else:
             st.warning("⚠️ 找不到主图文件")
 
 # --- ADD INGREDIENT FORM ---
 with st.expander("🧂 添加食材"):
-    ing_cat = st.selectbox("食材分类筛选", options=[""] + sorted(df_ing["食材分类"].dropna().unique().tolist()))
-    df_filt = df_ing[df_ing["食材分类"] == ing_cat] if ing_cat else df_ing
-    choices = df_filt["编号"].tolist()
-    labels = [f"{r['食材中文名']} ({r['编号']})" for _, r in df_filt.iterrows()]
-    sel = st.selectbox("选择食材", options=[""] + labels)
+    # Labels, per-category lists and 编号 -> row are cached per catalog version
+    picker = get_ingredient_picker(catalog)
+    ing_cat = st.selectbox("食材分类筛选", options=[""] + picker.categories)
+    ing_query = st.text_input("搜索食材（中英文）", key="ing_search")
+    with timed("search"):
+        choices = picker.options(ing_cat, ing_query)
+    code = st.selectbox("选择食材", options=[""] + choices, format_func=lambda s: picker.label(s) if s else "")
     qty = st.number_input("用量 (g/ml)", min_value=0.0, step=1.0, key="ing_qty")
     note = st.text_input("备注（选填）", key="ing_note")
     if st.button("➕ 添加食材"):
-        if sel and qty > 0:
-            code = sel.split("(")[-1].strip(")")
-            row = df_ing[df_ing["编号"] == code].iloc[0]
-            subtotal = qty * row["基础单位价格"]
+        if code and qty > 0:
+            row = picker.records[code]
+            unit_price = picker.unit_price(code)
+            subtotal = qty * unit_price if unit_price is not None else 0
             st.session_state.ingredients.append({
                 "编号": code, "食材中文名": row["食材中文名"],
-                "用量": qty, "单价": row["基础单位价格"],
+                "用量": qty, "单价": unit_price,
                 "小计": subtotal, "备注": note
             })
             st.success(f"添加: {row['食材中文名']} x{qty}g")
@@ -188,16 +200,16 @@ for i, step in enumerate(st.session_state.steps):
                 st.rerun()
 
     # Preview image
-    if step.get("图片名"):
-        st.image(os.path.join("uploaded_images", step["图片名"]), width=250, caption=f"步骤 {i+1} 图片")
+    step_img_path = stored_image_path(step["图片名"], 250) if step.get("图片名") else None
+    if step_img_path:
+        st.image(step_img_path, width=250, caption=f"步骤 {i+1} 图片")
 
 # --- SAVE RECIPE ---
 if st.button("✅ 保存菜谱"):
     if not (name_en and name_zh and st.session_state.ingredients and price > 0):
         st.warning("请填写完整：中英文名、至少一个食材、步骤、售价")
     else:
-        recs = json.load(open(REC_FILE, encoding="utf-8")) if os.path.exists(REC_FILE) else []
-        rid = recipe["编号"] if recipe else f"RC-{len(recs)+1:04d}"
+        rid = recipe["编号"] if recipe else storage.next_recipe_id()
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         new = {
             "编号": rid, "英文名": name_en, "中文名": name_zh, "分类": category,
@@ -207,12 +219,17 @@ if st.button("✅ 保存菜谱"):
             "备注": notes, "主图": main_img, "创建时间": recipe["创建时间"] if recipe else now, "修改时间": now,
             "SKUID": skuid
         }
-        if recipe:
-            idx = next(i for i,r in enumerate(recs) if r["编号"] == rid)
-            recs[idx] = new
-        else:
-            recs.append(new)
-        json.dump(recs, open(REC_FILE, "w", encoding="utf-8"), ensure_ascii=False, indent=2)
+        # Single-record write: an edit replaces its recipe, a new one must not
+        # overwrite an existing 编号
+        with timed("save"):
+            if recipe:
+                storage.save_recipe(new)
+            else:
+                try:
+                    storage.insert_recipe(new)
+                except ValueError as e:
+                    st.error(f"保存失败：{e}")
+                    st.stop()
         st.success("✅ 保存成功！")
         st.session_state.mode = "new"
         st.session_state.ingredients = []
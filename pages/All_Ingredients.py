@@ -8,7 +8,11 @@ import os
 from datetime import datetime
 import unicodedata #for weChat pasting
 import datetime
-from helper_functions import compute_unit_cost, clean_ingredient_df
+from helper_functions import compute_unit_cost, clean_ingredient_df, recost_recipes
+from storage import get_storage
+from catalog import CATEGORY_PREFIX, apply_ingredient_edits
+from search_index import get_search_index
+from profiling import timed, count
 
 # File Name for database
 DATA_FILE = "ingredients.csv"
@@ -29,26 +33,14 @@ COLUMNS = [
     "修改时间"       # Date Modified
 ]
 
-# Category to prefix mapping
-CATEGORY_PREFIX = {
-    "未加工肉类": "RME",
-    "加工肉类": "PME",
-    "海鲜类": "SEA",
-    "冻品类": "FRZ",
-    "调味品": "CON",
-    "干货": "DRY",
-    "蔬菜": "VEG",
-    "预制品": "PRE",
-    "厨房用品": "KTC"
-}
-
-# Create if no DB exists
-if not os.path.exists(DATA_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(DATA_FILE, index=False)
-    
-# Load existing if exists
-df = pd.read_csv(DATA_FILE)
-df = clean_ingredient_df(df)
+# Storage backend (creates an empty DB if none exists)
+storage = get_storage()
+
+# Load existing if exists (cached until the data changes)
+with timed("load"):
+    catalog = storage.load_catalog()
+df = catalog.df
+count("ingredients", len(df))
 
 st.title("🥬 食材数据库")
 st.markdown("Rourou Nanshan")
@@ -66,113 +58,73 @@ filtered_df = df.copy()
 if selected_type != "全部":
     filtered_df = filtered_df[filtered_df["食材分类"] == selected_type]
     
-# Strip everything from the search and make sure its compatiable with WeChat
-search_text = unicodedata.normalize("NFKC", search_text.strip())
-
-if search_text:
-    filtered_df = filtered_df[
-        filtered_df["食材中文名"].astype(str).str.contains(search_text, case=False, na=False) |
-        filtered_df["食材英文名"].astype(str).str.contains(search_text, case=False, na=False)
-    ]
+# Prebuilt n-gram index (NFKC + casefold, so WeChat pastes match); rebuilt only when the catalog changes
+with timed("search"):
+    hits = get_search_index(catalog).search(search_text)
 
 # Make sure creation time column is present   
 if "创建时间" not in filtered_df.columns:
     filtered_df["创建时间"] = ""
-    
-# -- Show More recent first 
-filtered_df = filtered_df.sort_values("创建时间", ascending=False)
+
+if search_text.strip():
+    # -- Best matches first
+    rank = {serial: i for i, serial in enumerate(hits)}
+    filtered_df = filtered_df[filtered_df["编号"].isin(rank)]
+    filtered_df = filtered_df.sort_values("编号", key=lambda col: col.map(rank))
+else:
+    # -- Show More recent first 
+    filtered_df = filtered_df.sort_values("创建时间", ascending=False)
 display_df = filtered_df.drop(columns=["创建时间"])
 
-edited_df = st.data_editor(
-    display_df,
-    use_container_width=True,
-    num_rows="dynamic",
-    key="editable_ingredients",
-    column_config={
-        "编号": st.column_config.TextColumn("编号", disabled=True),
-        # "单位价格": st.column_config.NumberColumn("单位价格", disabled=True),
-        "创建时间": st.column_config.TextColumn("创建时间", disabled=True),
-        "修改时间": st.column_config.TextColumn("修改时间", disabled=True),
-    }
-)
+with timed("render"):
+    edited_df = st.data_editor(
+        display_df,
+        use_container_width=True,
+        num_rows="dynamic",
+        key="editable_ingredients",
+        column_config={
+            "编号": st.column_config.TextColumn("编号", disabled=True),
+            # "单位价格": st.column_config.NumberColumn("单位价格", disabled=True),
+            "创建时间": st.column_config.TextColumn("创建时间", disabled=True),
+            "修改时间": st.column_config.TextColumn("修改时间", disabled=True),
+        }
+    )
 if st.button("💾 保存修改"):
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Create a copy of the full DataFrame to modify
-    df_updated = df.copy()
-
-    for i, row in edited_df.iterrows():
-        serial = row["编号"]
-        full_idx = df[df["编号"] == serial].index
-        if not full_idx.empty:
-            idx = full_idx[0]
-            # Compare only editable columns
-            for col in edited_df.columns:
-                if col in ["创建时间", "修改时间", "编号", "基础单位价格"]:
-                    continue
-                if pd.isna(row[col]) and pd.isna(df.at[idx, col]):
-                    continue
-                if row[col] != df.at[idx, col]:
-                    df_updated.at[idx, col] = row[col]
-                    df_updated.at[idx, "修改时间"] = now
-                    
-    # 🔁 Backup before overwrite
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    os.makedirs("backups", exist_ok=True)
-    backup_path = f"backups/ingredients_backup_{timestamp}.csv"
-    shutil.copy(DATA_FILE, backup_path)
-    # Backup path for recipes
-    recipe_backup_path = f"backups/recipes_backup_{timestamp}.json"
-    if os.path.exists(RECIPE_FILE):
-        shutil.copy(RECIPE_FILE, recipe_backup_path)
-
-    # Save the full dataset, not the filtered one
-    df_updated.to_csv(DATA_FILE, index=False, encoding="utf-8-sig")
-    st.success("✅ 修改已保存（全表已更新）")
+    with timed("save"):
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # One vectorized diff: changed cells, new rows and rows deleted in the editor
+        df_updated, summary = apply_ingredient_edits(df, display_df, edited_df, now)
+        changed_serials = set(summary["changed"])
+        added, deleted = summary["added"], summary["deleted"]
+
+        if not (changed_serials or added or deleted):
+            st.info("没有需要保存的修改")
+            st.stop()
+
+        # 🔁 Backup before overwrite
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        storage.backup(timestamp)
+
+        # Save the full dataset, not the filtered one (SQLite only writes changed rows)
+        storage.save_ingredients(df_updated, changed_serials | set(added), deleted=deleted)
+        st.success(f"✅ 修改已保存：修改 {len(changed_serials)} 行，新增 {len(added)} 行，删除 {len(deleted)} 行")
     
-    import json
-
-    # --- Load updated ingredients ---
-    ingredients_df = pd.read_csv(DATA_FILE)
-    ingredients_df = clean_ingredient_df(ingredients_df)
-    ingredient_map = {
-        row["编号"]: row for _, row in ingredients_df.iterrows()
-    }
-
-    # --- Load recipes ---
-    with open(RECIPE_FILE, "r", encoding="utf-8") as f:
-        recipes = json.load(f)
-
-    # --- Update recipes ---
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    for recipe in recipes:
-        updated_ingredients = []
-        for item in recipe.get("食材", []):
-            serial = item.get("编号")
-            ing = ingredient_map.get(serial)
-            if ing is None:
-                updated_ingredients.append(item)  # Ingredient not found in latest DB
-                continue
-
-            # Update cost & names
-            item["基础单位价格"] = ing["基础单位价格"]
-            item["总成本"] = float(item.get("用量", 0)) * ing["基础单位价格"]
-            item["食材英文名"] = ing.get("食材英文名", item.get("食材英文名", ""))
-            item["食材中文名"] = ing.get("食材中文名", item.get("食材中文名", ""))
-            updated_ingredients.append(item)
-
-        # Update the recipe ingredient list
-        recipe["食材"] = updated_ingredients
-
-        # Update cost and percentage
-        total_cost = sum(item["总成本"] for item in updated_ingredients)
-        recipe["总成本"] = round(total_cost, 2)
-        price = float(recipe.get("售价", 0))
-        recipe["成本百分比"] = round((total_cost / price) * 100, 2) if price else 0
-        recipe["修改时间"] = now
-
-    # --- Save updated recipes ---
-    with open(RECIPE_FILE, "w", encoding="utf-8") as f:
-        json.dump(recipes, f, ensure_ascii=False, indent=2)
+        # --- Load updated ingredients ---
+        catalog = storage.load_catalog()
+
+        # --- Load recipes and find the ones using a changed ingredient ---
+        recipes = storage.load_recipes()
+        index = storage.ingredient_index(recipes)
+        affected_ids = index.recipes_using(changed_serials)
+
+        # --- Update affected recipes only ---
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        updated_recipes = recost_recipes(recipes, affected_ids, catalog, now)
+
+        # --- Save updated recipes ---
+        if updated_recipes:
+            storage.upsert_recipes(updated_recipes)
+            st.info(f"🔁 已更新 {len(updated_recipes)} 个相关菜谱的成本")
 
 
@@ -1,12 +1,12 @@
 import streamlit as st
-import json
-import os
 from helper_functions import render_recipe, merge_ingredients_into_recipes
+from recipe_store import category_label
+from storage import get_storage
+from profiling import timed, count
 
 
-
-# path to recipes
-RECIPE_FILE = "recipes.json"
+# storage backend (recipes.json or SQLite)
+storage = get_storage()
 
 # paget setup
 st.set_page_config(page_title="所有菜谱", layout="wide")
@@ -14,52 +14,79 @@ st.title("📚 所有菜谱")
 st.markdown("此页用于查看、编辑或删除已保存的菜谱")
 
 
-# load recipes file
-if os.path.exists(RECIPE_FILE):
-    with open(RECIPE_FILE, "r", encoding="utf-8") as f:
-        recipes = json.load(f)
-else:
-    recipes = []
+# Page sizes offered in the sidebar
+PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+DEFAULT_PAGE_SIZE = 20
 
-# ✅ Always merge updated ingredient costs
-recipes = merge_ingredients_into_recipes(recipes)
+# Fields the list needs; full recipes are only read for the current page
+LIST_FIELDS = ["编号", "中文名", "英文名", "SKUID", "售价", "分类"]
 
+# --- Category Filtering (from the recipes.json sidecar index, no full parse) ---
+with timed("load"):
+    categories = sorted({category_label(c) for c in storage.recipe_categories()})
 
-if not recipes:
+if not categories:
     st.info("No recipes currently exist")
     st.stop()
-    
-# Helper file, save updated lists back to file
+
+# Helper file, save updated lists back to storage. Only the page's recipes
+# are loaded, so write them as upserts rather than replacing the whole file.
 def save_recipes(updated_list):
-    with open(RECIPE_FILE, "w", encoding="utf-8") as f:
-        json.dump(updated_list, f, ensure_ascii=False, indent=2)
-        
-# --- Category Filtering ---
-categories = sorted(list({r.get("分类", "未分类") for r in recipes}))
+    with timed("save"):
+        storage.upsert_recipes(updated_list)
+
 selected_category = st.selectbox("按菜单分类筛选", ["全部"] + categories)
 
-# Apply filtering or grouping
+# Apply filtering or grouping (streamed, list fields only)
+with timed("load"):
+    if selected_category == "全部":
+        summaries = list(storage.iter_recipes(fields=LIST_FIELDS))
+    else:
+        summaries = list(storage.iter_recipes(fields=LIST_FIELDS, category=selected_category))
+count("recipes", len(summaries))
+
 if selected_category == "全部":
-    # Group by category
+    # Group by category (keeps first-seen category order)
     grouped = {}
-    for r in recipes:
-        cat = r.get("分类", "未分类")
+    for r in summaries:
+        cat = category_label(r.get("分类"))
         grouped.setdefault(cat, []).append(r)
-    
-    for cat_name, group in grouped.items():
+    listed = [(cat_name, r) for cat_name, group in grouped.items() for r in group]
+else:
+    listed = [(selected_category, r) for r in summaries]
+
+# --- Pagination ---
+page_size = st.sidebar.selectbox(
+    "每页菜谱数", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key="recipes_page_size"
+)
+page_count = max(1, -(-len(listed) // page_size))
+page = st.sidebar.number_input("页码", min_value=1, max_value=page_count, value=1, step=1, key="recipes_page")
+page = min(page, page_count)
+st.caption(f"共 {len(listed)} 个菜谱 · 第 {page} / {page_count} 页")
+page_items = listed[(page - 1) * page_size:page * page_size]
+
+# Full recipes for this page only (seek by offset)
+with timed("load"):
+    full = {r["编号"]: r for r in storage.iter_recipes(ids={r["编号"] for _, r in page_items})}
+page_items = [(cat_name, full[r["编号"]]) for cat_name, r in page_items if r["编号"] in full]
+recipes = [r for _, r in page_items]
+
+# ✅ Always merge updated ingredient costs (only for the recipes on this page)
+with timed("merge"):
+    merge_ingredients_into_recipes(recipes, catalog=storage.load_catalog())
+
+# --- Recipe list ---
+# The full body (tables, images, step columns) is only built for recipes the
+# user has opened; closed ones cost a single toggle widget per rerun.
+current_cat = None
+for index, (cat_name, recipe) in enumerate(page_items):
+    if selected_category == "全部" and cat_name != current_cat:
         st.subheader(f"📂 分类: {cat_name}")
-        for index, recipe in enumerate(group):
-            skuid = recipe.get("SKUID") or "N/A"
-            label = f"{recipe['编号']} {recipe['中文名']} / {recipe['英文名']} — SKUID: {skuid} — 售价: ¥{recipe['售价']}"
-            with st.expander(label):
-                render_recipe(recipe, index, recipes, save_recipes)
+        current_cat = cat_name
 
-else:
-    # Show only selected category
-    filtered_recipes = [r for r in recipes if r.get("分类") == selected_category]
-    for index, recipe in enumerate(filtered_recipes):
-        skuid = recipe.get("SKUID") or "N/A"
-        label = f"{recipe['编号']} {recipe['中文名']} / {recipe['英文名']} — SKUID: {skuid} — 售价: ¥{recipe['售价']}"
-        with st.expander(label):
-            render_recipe(recipe, index, recipes, save_recipes)
-            
+    skuid = recipe.get("SKUID") or "N/A"
+    label = f"{recipe['编号']} {recipe['中文名']} / {recipe['英文名']} — SKUID: {skuid} — 售价: ¥{recipe['售价']}"
+    if st.toggle(label, key=f"open_recipe_{recipe['编号']}"):
+        count("recipes opened")
+        with st.container(border=True), timed("render"):
+            render_recipe(recipe, index, recipes, save_recipes, storage.delete_recipe, storage.image_index())
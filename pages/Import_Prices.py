@@ -0,0 +1,60 @@
+import streamlit as st
+
+st.set_page_config(page_title="食材数据库", layout="centered")
+
+import datetime
+
+from helper_functions import recost_recipes
+from price_import import import_price_list, read_price_list
+from storage import get_storage
+from profiling import timed
+
+storage = get_storage()
+
+st.title("📥 导入供应商价格表")
+st.caption("CSV / XLSX：按编号或食材中文名匹配，更新价格，新食材自动编号")
+
+uploaded = st.file_uploader("价格表", type=["csv", "xlsx"])
+if uploaded is None:
+    st.stop()
+
+with timed("load"):
+    catalog = storage.load_catalog()
+now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+try:
+    with timed("parse"):
+        df_updated, summary = import_price_list(catalog.df, read_price_list(uploaded, uploaded.name), now)
+except (ImportError, ValueError) as e:
+    st.error(f"无法读取价格表：{e}")
+    st.stop()
+
+updated, added = summary["updated"], summary["added"]
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("更新", len(updated))
+col2.metric("新增", len(added))
+col3.metric("未变", summary["unchanged"])
+col4.metric("跳过", summary["skipped"])
+
+# --- Preview ---
+changed_rows = df_updated[df_updated["编号"].isin(set(updated) | set(added))]
+if changed_rows.empty:
+    st.info("价格表与当前数据一致，没有需要导入的内容")
+    st.stop()
+st.dataframe(changed_rows.head(200), hide_index=True)
+if len(changed_rows) > 200:
+    st.caption(f"仅显示前 200 行（共 {len(changed_rows)} 行）")
+
+if st.button("✅ 确认导入"):
+    with timed("save"):
+        storage.backup(datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+        storage.save_ingredients(df_updated, set(updated) | set(added))
+    st.success(f"✅ 已导入：更新 {len(updated)} 行，新增 {len(added)} 行")
+
+    # --- Recost recipes that use a repriced ingredient ---
+    recipes = storage.load_recipes()
+    affected_ids = storage.ingredient_index(recipes).recipes_using(updated)
+    updated_recipes = recost_recipes(recipes, affected_ids, storage.load_catalog(), now)
+    if updated_recipes:
+        with timed("save"):
+            storage.upsert_recipes(updated_recipes)
+        st.info(f"🔁 已更新 {len(updated_recipes)} 个相关菜谱的成本")
@@ -0,0 +1,61 @@
+import streamlit as st
+
+st.set_page_config(page_title="价格历史", layout="wide")
+
+import datetime
+
+import pandas as pd
+
+from price_history import menu_costs_as_of
+from storage import get_storage
+from profiling import timed
+
+storage = get_storage()
+
+st.title("📉 价格历史")
+st.caption("每次保存价格都会记录一条历史，可查看单个食材的价格走势，或按任意日期计算菜谱成本")
+
+with timed("load"):
+    catalog = storage.load_catalog()
+    history = storage.load_price_history()
+
+if len(history) == 0:
+    st.info("还没有价格历史：第一次保存食材价格时会自动记录当前价格")
+    st.stop()
+
+# --- Trend per ingredient ---
+st.subheader("食材价格走势")
+typed = catalog.typed
+names = dict(zip(typed["编号"].tolist(), typed["食材中文名"].fillna("").tolist()))
+serial = st.selectbox(
+    "食材",
+    history.serials,
+    format_func=lambda s: f"{s} {names.get(s, '（已删除）')}",
+)
+series = history.series(serial)
+chart = series.assign(生效时间=pd.to_datetime(series["生效时间"])).set_index("生效时间")
+col1, col2 = st.columns(2)
+with col1:
+    st.caption("单位价格")
+    st.line_chart(chart["单位价格"], height=220)
+with col2:
+    st.caption("基础单位价格")
+    st.line_chart(chart["基础单位价格"], height=220)
+st.dataframe(series, hide_index=True)
+
+# --- Menu cost at a date ---
+st.subheader("按日期计算菜谱成本")
+day = st.date_input("日期", value=datetime.date.today())
+when = datetime.datetime.combine(day, datetime.time.max)
+
+with timed("load"):
+    recipes = storage.load_recipes()
+with timed("as-of costing"):
+    then = menu_costs_as_of(recipes, history, when)
+    now = menu_costs_as_of(recipes, history, datetime.datetime.now())
+
+compare = then.rename(columns={"总成本": "当时成本", "成本百分比": "当时成本百分比"})
+compare["当前成本"] = now["总成本"]
+compare["当前成本百分比"] = now["成本百分比"]
+compare["成本变化"] = (compare["当前成本"] - compare["当时成本"]).round(2)
+st.dataframe(compare.sort_values("成本变化", key=abs, ascending=False), hide_index=True)
@@ -0,0 +1,69 @@
+import streamlit as st
+
+st.set_page_config(page_title="价格模拟", layout="wide")
+
+import pandas as pd
+
+from scenarios import ADJUST_FIELDS, SCENARIO_COLUMNS, ScenarioRunner, scenarios_from_table, summarize
+from storage import get_storage
+from profiling import timed, count
+
+storage = get_storage()
+
+st.title("📈 价格情景模拟")
+st.caption("按编号、食材分类或供应商调整价格，一次对比多个情景对所有菜谱成本的影响（不会修改数据）")
+
+with timed("load"):
+    catalog = storage.load_catalog()
+    recipes = storage.load_recipes()
+count("recipes", len(recipes))
+
+if not recipes:
+    st.info("No recipes currently exist")
+    st.stop()
+
+# --- Scenario editor: one row per adjustment, rows with the same 情景 combine ---
+if "scenario_table" not in st.session_state:
+    st.session_state.scenario_table = pd.DataFrame(
+        [["肉类涨价", "食材分类", "未加工肉类", 12.0]], columns=SCENARIO_COLUMNS
+    )
+
+values = {
+    "食材分类": sorted(v for v in catalog.df["食材分类"].unique() if v),
+    "供应商": sorted(v for v in catalog.df["供应商"].unique() if v),
+}
+with st.expander("可选值"):
+    for field, options in values.items():
+        st.caption(f"{field}：{'、'.join(options)}")
+
+table = st.data_editor(
+    st.session_state.scenario_table,
+    num_rows="dynamic",
+    hide_index=True,
+    column_config={
+        "类型": st.column_config.SelectboxColumn(options=ADJUST_FIELDS, required=True),
+        "调整%": st.column_config.NumberColumn(format="%.1f", step=0.5),
+    },
+    key="scenario_editor",
+)
+scenarios = scenarios_from_table(table)
+if not scenarios:
+    st.info("请至少添加一条调整：情景名、类型、值和调整%")
+    st.stop()
+
+with timed("build"):
+    runner = ScenarioRunner(recipes, catalog)
+with timed("simulate"):
+    result = runner.run(scenarios)
+
+# --- Results ---
+st.subheader("情景汇总")
+st.dataframe(summarize(result), hide_index=True)
+
+selected = st.selectbox("查看情景", list(scenarios))
+only_changed = st.checkbox("只显示成本变化的配方", value=True)
+shown = result[result["情景"] == selected]
+if only_changed:
+    shown = shown[shown["成本变化"] != 0]
+st.dataframe(shown.drop(columns="情景"), hide_index=True)
+count("rows rendered", len(shown))
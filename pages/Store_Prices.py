@@ -0,0 +1,91 @@
+import streamlit as st
+
+st.set_page_config(page_title="门店价格", layout="wide")
+
+from scenarios import summarize
+from store_prices import OVERLAY_COLUMNS, check_store_name, store_costs
+from storage import get_storage
+from profiling import timed, count
+
+storage = get_storage()
+
+st.title("🏪 门店价格")
+st.caption("各门店共用同一份食材库，只记录与总库不同的单位价格 / 供应商；下方一次计算所有门店的菜谱成本")
+
+with timed("load"):
+    catalog = storage.load_catalog()
+    stores = storage.list_stores()
+
+# --- Store overrides ---
+col1, col2 = st.columns([2, 1])
+with col2:
+    new_store = st.text_input("新门店名称").strip()
+    if new_store:
+        try:
+            new_store = check_store_name(new_store)
+        except ValueError as e:
+            st.error(str(e))
+            new_store = ""
+options = stores + ([new_store] if new_store and new_store not in stores else [])
+with col1:
+    store = st.selectbox("门店", options, index=len(options) - 1 if new_store else 0)
+if not store:
+    st.info("还没有门店：输入新门店名称开始添加覆盖价格")
+    st.stop()
+
+overlay = storage.load_store_overlay(store)
+names = {serial: row.get("食材中文名", "") for serial, row in catalog.by_serial.items()}
+shown = overlay.df.assign(
+    食材中文名=overlay.df["编号"].map(names),
+    总库单位价格=overlay.df["编号"].map(lambda s: catalog.by_serial.get(s, {}).get("单位价格")),
+)
+edited = st.data_editor(
+    shown[["编号", "食材中文名", "总库单位价格", "单位价格", "供应商"]],
+    num_rows="dynamic",
+    hide_index=True,
+    column_config={
+        "编号": st.column_config.SelectboxColumn(
+            options=list(catalog.by_serial), required=True,
+        ),
+        "单位价格": st.column_config.NumberColumn(format="%.2f", help="留空 = 与总库相同"),
+        "供应商": st.column_config.TextColumn(help="留空 = 与总库相同"),
+    },
+    disabled=["食材中文名", "总库单位价格"],
+    key=f"overlay_editor_{store}",
+)
+if st.button("💾 保存门店价格"):
+    with timed("save"):
+        written = storage.save_store_overlay(store, edited[OVERLAY_COLUMNS])
+    st.success(f"✅ 已保存 {store}：{len(written)} 条覆盖")
+    st.rerun()
+st.caption(f"{store}：{len(overlay)} 条覆盖")
+
+# --- All stores at once ---
+st.subheader("各门店菜谱成本")
+with timed("load"):
+    recipes = storage.load_recipes()
+    overlays = [storage.load_store_overlay(s) for s in storage.list_stores()]
+count("stores", len(overlays))
+if not recipes or not overlays:
+    st.info("保存至少一个门店的覆盖价格后，这里会对比所有门店的成本")
+    st.stop()
+
+with timed("cost all stores"):
+    result = store_costs(recipes, catalog, overlays)
+
+summary = summarize(result).rename(columns={"情景": "门店"})
+st.dataframe(summary, hide_index=True)
+
+# One row per recipe: 总库 cost, then cost / 成本百分比 per store
+wide = result.pivot_table(
+    index=["编号", "中文名", "售价", "原成本", "原成本百分比"],
+    columns="情景",
+    values=["新成本", "新成本百分比"],
+    observed=True,
+    dropna=False,  # keep recipes without a 售价
+)
+wide.columns = [f"{store} {'成本' if value == '新成本' else '成本百分比'}" for value, store in wide.columns]
+order = [f"{o.store} {kind}" for o in overlays for kind in ("成本", "成本百分比")]
+wide = wide[order].reset_index().rename(columns={"原成本": "总库成本", "原成本百分比": "总库成本百分比"})
+st.dataframe(wide, hide_index=True)
+count("rows rendered", len(wide))
@@ -8,6 +8,8 @@ from datetime import datetime
 import unicodedata #for weChat pasting
 
 from helper_functions import compute_unit_cost
+from storage import get_storage
+from profiling import timed
 
 # File Name for database
 DATA_FILE = "ingredients.csv"
@@ -40,12 +42,12 @@ CATEGORY_PREFIX = {
     "厨房用品": "KTC"
 }
 
-# Create if no DB exists
-if not os.path.exists(DATA_FILE):
-    pd.DataFrame(columns=COLUMNS).to_csv(DATA_FILE, index=False)
-    
+# Storage backend (creates an empty DB if none exists)
+storage = get_storage()
+
 # Load existing if exists
-df = pd.read_csv(DATA_FILE)
+with timed("load"):
+    df = storage.load_catalog().df
 
 st.title("🥬 食材数据库")
 st.markdown("Rourou Nanshan")
@@ -113,12 +115,13 @@ with st.form("ingredient_form"):
             ref_number = f"{prefix}-{next_num:04d}"
             normalized_cost = compute_unit_cost(st.session_state.unit_selected, cost, volume)
             
-            new_row = pd.DataFrame([[
+            new_row = dict(zip(COLUMNS, [
                 ref_number, supplier, name_en, name_zh, food_type,
                 st.session_state.unit_selected, cost, volume, normalized_cost, now, now
-            ]], columns=COLUMNS)
+            ]))
             
-            new_row.to_csv(DATA_FILE, mode="a", header=False, index=False)
+            with timed("save"):
+                storage.add_ingredient(new_row)
             st.success(f"成功添加：{name_zh} / {name_en}（编号：{ref_number}）")
             
             # reset to empyt fields
@@ -0,0 +1,191 @@
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from catalog import TIMESTAMP_FORMAT
+from cost_engine import CostMatrix
+from helper_functions import compute_unit_costs
+
+# Append-only: one row per price an ingredient has had, from 生效时间 on.
+# ingredients.csv only holds the current price; this keeps the old ones.
+HISTORY_FILE = "price_history.csv"
+HISTORY_COLUMNS = ["编号", "生效时间", "单位", "单位价格", "单位容量", "基础单位价格"]
+
+# Process-wide cache like catalog._CATALOG_CACHE: absolute path -> PriceHistory
+_HISTORY_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_WRITE_LOCK = threading.Lock()
+
+
+def _to_ns(when):
+    """datetime / date / 'YYYY-mm-dd[ HH:MM:SS]' -> int64 nanoseconds."""
+    return pd.Timestamp(when).value
+
+
+class PriceHistory:
+    """Price history sorted by (编号, 生效时间).
+
+    Each ingredient's entries are one contiguous, time-sorted slice of the
+    arrays, so a single lookup is a binary search in its slice and the whole
+    catalog at a date is one vectorized pass.
+    """
+
+    def __init__(self, df, signature=None):
+        self.signature = signature
+        times = pd.to_datetime(df["生效时间"], format=TIMESTAMP_FORMAT, errors="coerce")
+        df = df[times.notna()].assign(_t=times[times.notna()].astype("datetime64[ns]").astype("int64"))
+        codes, serials = pd.factorize(df["编号"].astype(str), sort=True)
+        # Stable: of two entries at the same time the later-appended one wins
+        order = np.lexsort((np.arange(len(df)), df["_t"].to_numpy(), codes))
+        self.df = df.iloc[order].drop(columns="_t").reset_index(drop=True)
+        codes = codes[order]
+
+        self.serials = list(serials)
+        self._pos = {s: i for i, s in enumerate(self.serials)}
+        self.times = df["_t"].to_numpy()[order]
+        self.prices = pd.to_numeric(self.df["基础单位价格"], errors="coerce").to_numpy(dtype=float)
+        self.unit_prices = pd.to_numeric(self.df["单位价格"], errors="coerce").to_numpy(dtype=float)
+        segments = np.arange(len(self.serials))
+        self.starts = np.searchsorted(codes, segments, side="left")
+        self.ends = np.searchsorted(codes, segments, side="right")
+
+    def __len__(self):
+        return len(self.df)
+
+    def _index_at(self, serial, t):
+        i = self._pos.get(serial)
+        if i is None:
+            return None
+        start, end = int(self.starts[i]), int(self.ends[i])
+        idx = bisect_right(self.times, t, start, end) - 1
+        return idx if idx >= start else None
+
+    def entry_at(self, serial, when):
+        """The history row in effect for `serial` at `when` (dict), or None."""
+        idx = self._index_at(serial, _to_ns(when))
+        return None if idx is None else self.df.iloc[idx].to_dict()
+
+    def price_at(self, serial, when):
+        """基础单位价格 of `serial` at `when`, or None if it had no price yet."""
+        idx = self._index_at(serial, _to_ns(when))
+        if idx is None or np.isnan(self.prices[idx]):
+            return None
+        return float(self.prices[idx])
+
+    def as_of(self, when):
+        """编号 -> 基础单位价格 for every ingredient that had a price at `when`.
+
+        Same shape as Catalog.unit_prices, so CostMatrix can cost with it.
+        """
+        # Slices are time-sorted, so the entries <= t are a prefix of each slice
+        upto = np.concatenate([[0], np.cumsum(self.times <= _to_ns(when))])
+        counts = upto[self.ends] - upto[self.starts]
+        has = np.flatnonzero(counts > 0)
+        last = self.starts[has] + counts[has] - 1
+        return {
+            self.serials[i]: (None if price != price else price)  # NaN -> None
+            for i, price in zip(has.tolist(), self.prices[last].tolist())
+        }
+
+    def series(self, serial):
+        """All entries for `serial`, oldest first (for trend charts)."""
+        i = self._pos.get(serial)
+        if i is None:
+            return self.df.iloc[0:0]
+        return self.df.iloc[int(self.starts[i]):int(self.ends[i])]
+
+
+def load_history(path=HISTORY_FILE):
+    """Cached PriceHistory for `path`, re-read only when the file changed."""
+    if not os.path.exists(path):
+        return PriceHistory(pd.DataFrame(columns=HISTORY_COLUMNS))
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _CACHE_LOCK:
+        cached = _HISTORY_CACHE.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached
+    df = pd.read_csv(path, dtype={"编号": str, "单位": str, "生效时间": str})
+    history = PriceHistory(df, signature)
+    with _CACHE_LOCK:
+        _HISTORY_CACHE[key] = history
+    return history
+
+
+def _same(a, b):
+    return a == b or (a != a and b != b)
+
+
+def record_prices(df, path=HISTORY_FILE, now=None):
+    """Append the prices in `df` (catalog rows) that the history doesn't have yet.
+
+    Each row takes effect at its 修改时间 (创建时间, then `now`, if blank). A
+    row is skipped when the entry already in effect at that time has the same
+    单位价格 and 基础单位价格, so re-recording is harmless. Returns the number
+    of rows appended.
+    """
+    if df.empty:
+        return 0
+    now = now or datetime.now().strftime(TIMESTAMP_FORMAT)
+    rows = pd.DataFrame({
+        "编号": df["编号"].astype(str),
+        "生效时间": df["修改时间"].where(df["修改时间"].fillna("") != "", df["创建时间"]).fillna("").replace("", now),
+        "单位": df["单位"],
+        "单位价格": pd.to_numeric(df["单位价格"], errors="coerce"),
+        "单位容量": df["单位容量"],
+        "基础单位价格": compute_unit_costs(df["单位"], df["单位价格"], df["单位容量"]).values,
+    })
+    rows = rows[rows["编号"] != ""]
+
+    with _WRITE_LOCK:
+        history = load_history(path)
+        keep = []
+        for serial, when, unit_price, base in zip(
+            rows["编号"].tolist(), rows["生效时间"].tolist(),
+            rows["单位价格"].tolist(), rows["基础单位价格"].tolist(),
+        ):
+            try:
+                idx = history._index_at(serial, _to_ns(when))
+            except ValueError:
+                idx = None
+            keep.append(
+                idx is None
+                or not _same(float(history.unit_prices[idx]), unit_price)
+                or not _same(float(history.prices[idx]), base)
+            )
+        new_rows = rows[keep]
+        if new_rows.empty:
+            return 0
+        new_rows.to_csv(path, mode="a", header=not os.path.exists(path), index=False, encoding="utf-8")
+    return len(new_rows)
+
+
+def seed_history(df, path=HISTORY_FILE):
+    """Start the history from the current catalog if there is none yet.
+
+    Call before overwriting prices, so the first edit keeps the old price too.
+    """
+    if os.path.exists(path):
+        return 0
+    return record_prices(df, path)
+
+
+def menu_costs_as_of(recipes, history, when):
+    """DataFrame of each recipe's 总成本 / 成本百分比 at `when`.
+
+    Lines are costed like CostMatrix.apply: per-line rounding, and lines whose
+    ingredient had no price yet keep their stored 小计.
+    """
+    costs, percents = CostMatrix(recipes).recipe_costs(history.as_of(when))
+    return pd.DataFrame({
+        "编号": [r.get("编号") for r in recipes],
+        "中文名": [r.get("中文名", "") for r in recipes],
+        "售价": [r.get("售价", 0) for r in recipes],
+        "总成本": costs,
+        "成本百分比": percents,
+    })
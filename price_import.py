@@ -0,0 +1,176 @@
+import os
+
+import pandas as pd
+
+from catalog import allocate_serials, cells_differ
+from helper_functions import compute_unit_costs
+from search_index import normalize
+
+# Rows per chunk when streaming a supplier file
+CHUNK_SIZE = 5000
+
+# Supplier headers we understand -> our column names
+COLUMN_ALIASES = {
+    "编号": ["编号", "serial", "ref"],
+    "供应商": ["供应商", "供货商", "supplier"],
+    "食材英文名": ["食材英文名", "英文名", "name_en"],
+    "食材中文名": ["食材中文名", "中文名", "品名", "name_zh"],
+    "食材分类": ["食材分类", "分类", "category", "type"],
+    "单位": ["单位", "unit"],
+    "单位价格": ["单位价格", "单价", "价格", "price", "cost"],
+    "单位容量": ["单位容量", "容量", "规格", "volume"],
+}
+
+# Columns a price list may overwrite on an existing ingredient
+UPDATE_COLUMNS = ["供应商", "单位", "单位价格", "单位容量"]
+
+
+def _rename_columns(columns):
+    lookup = {}
+    for target, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            lookup[normalize(alias)] = target
+    return {c: lookup[normalize(c)] for c in columns if normalize(c) in lookup}
+
+
+def _read_xlsx(source, chunksize):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Reading .xlsx price lists needs openpyxl (pip install openpyxl)")
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h) if h is not None else "" for h in header]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        wb.close()
+
+
+def read_price_list(source, filename=None, chunksize=CHUNK_SIZE):
+    """Yield the supplier file as DataFrames of at most `chunksize` rows.
+
+    `source` is a path or a file object (e.g. a Streamlit upload); `filename`
+    decides the format when `source` has no name. .xlsx needs openpyxl.
+    """
+    name = filename or getattr(source, "name", None) or str(source)
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        yield from _read_xlsx(source, chunksize)
+    elif ext in (".csv", ".txt"):
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+    else:
+        raise ValueError(f"Unsupported price list format: {ext or name}")
+
+
+def normalize_price_list(chunk):
+    """Rename supplier headers, keep known columns and coerce the numbers."""
+    chunk = chunk.rename(columns=_rename_columns(chunk.columns))
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+    chunk = chunk[[c for c in COLUMN_ALIASES if c in chunk.columns]].copy()
+    for col in chunk.columns:
+        if col in ("单位价格", "单位容量"):
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        else:
+            values = chunk[col].astype(object).where(chunk[col].notna(), "")
+            values = values.astype(str).str.strip()
+            chunk[col] = values.where(values != "", None)
+    return chunk
+
+
+def import_price_list(df, chunks, now):
+    """Upsert a supplier price list into the catalog DataFrame `df`.
+
+    Rows are matched by 编号 when given, otherwise by normalized 食材中文名.
+    Matched rows get their price columns updated (blank cells keep the current
+    value), unmatched rows become new ingredients with serials from one
+    grouped allocate_serials pass. 基础单位价格 is computed in batch for both.
+    Returns `(updated_df, summary)` with `updated` (编号 -> list of columns),
+    `added` (编号s), `unchanged` and `skipped` (row counts).
+    """
+    parts = [normalize_price_list(c) for c in chunks]
+    prices = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    prices = prices.reindex(columns=list(COLUMN_ALIASES))
+
+    # --- Drop rows we can't use: no price, or nothing to identify them ---
+    usable = prices["单位价格"].notna() & (prices["编号"].notna() | prices["食材中文名"].notna())
+    skipped = int((~usable).sum())
+    prices = prices[usable]
+    if prices.empty:
+        return df.copy(), {"updated": {}, "added": [], "unchanged": 0, "skipped": skipped}
+
+    # --- Match to existing ingredients ---
+    base = df.drop_duplicates("编号").set_index("编号")
+    names = pd.Series(base.index, index=base["食材中文名"].fillna("").map(normalize).values)
+    names = names[~names.index.duplicated() & (names.index != "")]
+
+    by_serial = prices["编号"].where(base.index.get_indexer(prices["编号"].fillna("")) >= 0)
+    by_name = prices["食材中文名"].fillna("").map(normalize).map(names)
+    prices = prices.assign(_serial=by_serial.fillna(by_name))
+
+    # A weekly list often repeats an item; the last line wins
+    new_keys = ("NEW:" + prices["食材中文名"].fillna("").map(normalize)).astype(object)
+    key = prices["_serial"].astype(object).fillna(new_keys)
+    prices = prices[~key.duplicated(keep="last")]
+
+    matched = prices[prices["_serial"].notna()].set_index("_serial")
+    new_rows = prices[prices["_serial"].isna()]
+
+    # --- Update matched rows ---
+    updated = base.copy()
+    old = base.loc[matched.index, UPDATE_COLUMNS]
+    incoming = pd.DataFrame(
+        {c: matched[c].where(matched[c].notna(), old[c]).astype(base[c].dtype) for c in UPDATE_COLUMNS}
+    )
+    diff = pd.DataFrame({c: cells_differ(old[c], incoming[c]) for c in UPDATE_COLUMNS}, index=matched.index)
+    changed_mask = diff.any(axis=1)
+    changed = {
+        serial: [c for c in UPDATE_COLUMNS if row[c]]
+        for serial, row in diff[changed_mask].iterrows()
+    }
+    if changed:
+        changed_serials = list(changed)
+        for c in UPDATE_COLUMNS:
+            col_changed = diff.index[diff[c]]
+            if len(col_changed):
+                updated.loc[col_changed, c] = incoming.loc[col_changed, c]
+        updated.loc[changed_serials, "基础单位价格"] = compute_unit_costs(
+            updated.loc[changed_serials, "单位"],
+            updated.loc[changed_serials, "单位价格"],
+            updated.loc[changed_serials, "单位容量"],
+        ).values
+        updated.loc[changed_serials, "修改时间"] = now
+    updated = updated.reset_index()
+
+    # --- New ingredients ---
+    added = []
+    if not new_rows.empty:
+        new_rows = new_rows.drop(columns="_serial").reindex(columns=df.columns).copy()
+        new_rows["编号"] = allocate_serials(updated["编号"], new_rows["食材分类"])
+        new_rows["基础单位价格"] = compute_unit_costs(
+            new_rows["单位"], new_rows["单位价格"], new_rows["单位容量"]
+        ).values
+        new_rows["创建时间"] = now
+        new_rows["修改时间"] = now
+        added = new_rows["编号"].tolist()
+        updated = pd.concat([updated, new_rows], ignore_index=True)
+
+    updated = updated[list(df.columns)]
+    summary = {
+        "updated": changed,
+        "added": added,
+        "unchanged": int(len(matched) - len(changed)),
+        "skipped": skipped,
+    }
+    return updated, summary
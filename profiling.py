@@ -0,0 +1,172 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import streamlit as st
+
+# Opt in with RECIPE_APP_DEBUG=1 or ?debug=1 in the URL
+DEBUG_ENV = "RECIPE_APP_DEBUG"
+
+# One JSON line per rerun; rotated to perf_log.jsonl.1 past PERF_LOG_MAX_BYTES
+PERF_LOG_FILE = "perf_log.jsonl"
+PERF_LOG_MAX_BYTES = 1024 * 1024
+
+HISTORY_SIZE = 20  # reruns kept for the sidebar panel
+PROFILE_TOP = 30  # functions shown from a cProfile capture
+
+# Each Streamlit session runs its script in its own thread
+_local = threading.local()
+_LOG_LOCK = threading.Lock()
+
+
+class RerunStats:
+    """Phase durations and counters collected during one script run."""
+
+    def __init__(self, page):
+        self.page = page
+        self.started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.phases = {}  # phase -> [seconds, calls]
+        self.counts = {}
+        self.total = None
+        self.status = "ok"
+
+    def add(self, phase, seconds):
+        entry = self.phases.setdefault(phase, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def to_dict(self):
+        return {
+            "time": self.started,
+            "page": self.page,
+            "status": self.status,
+            "total_ms": round(self.total * 1000, 2) if self.total is not None else None,
+            "phases": {
+                name: {"ms": round(seconds * 1000, 2), "calls": calls}
+                for name, (seconds, calls) in self.phases.items()
+            },
+            "counts": dict(self.counts),
+        }
+
+
+def current_rerun():
+    return getattr(_local, "rerun", None)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to `phase` of the current rerun (if any)."""
+    stats = current_rerun()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.add(phase, time.perf_counter() - start)
+
+
+def timed_phase(phase):
+    """Decorator form of `timed`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(phase):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Bump a per-rerun counter (e.g. recipes rendered)."""
+    stats = current_rerun()
+    if stats is not None:
+        stats.counts[name] = stats.counts.get(name, 0) + n
+
+
+def debug_enabled():
+    return os.environ.get(DEBUG_ENV) == "1" or st.query_params.get("debug") == "1"
+
+
+@contextmanager
+def rerun(page):
+    """Instrument one run of `page`: timings, JSONL log and the debug panel.
+
+    Does nothing unless debug is enabled, so `timed` blocks cost two
+    perf_counter calls in normal use.
+    """
+    if not debug_enabled():
+        yield None
+        return
+
+    stats = RerunStats(page)
+    _local.rerun = stats
+    profiler = None
+    if st.session_state.pop("_perf_profile_next", False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield stats
+    except BaseException as e:
+        # st.stop() / st.rerun() / st.switch_page() end a run by raising
+        stats.status = type(e).__name__
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            st.session_state["_perf_profile"] = _format_profile(profiler, page)
+        stats.total = time.perf_counter() - start
+        _local.rerun = None
+
+        record = stats.to_dict()
+        _append_log(record)
+        history = st.session_state.setdefault("_perf_history", [])
+        history.append(record)
+        del history[:-HISTORY_SIZE]
+        _render_panel(record, history)
+
+
+def _format_profile(profiler, page):
+    out = io.StringIO()
+    out.write(f"{page}\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+def _append_log(record, path=PERF_LOG_FILE):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _LOG_LOCK:
+        if os.path.exists(path) and os.path.getsize(path) >= PERF_LOG_MAX_BYTES:
+            os.replace(path, path + ".1")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _request_profile():
+    st.session_state["_perf_profile_next"] = True
+
+
+def _render_panel(record, history):
+    with st.sidebar.expander("🐞 性能 Profiling", expanded=True):
+        st.markdown(f"**{record['page']}** · {record['total_ms']} ms · {record['status']}")
+        if record["phases"]:
+            st.dataframe(
+                [{"阶段": name, "ms": p["ms"], "次数": p["calls"]} for name, p in record["phases"].items()],
+                hide_index=True,
+            )
+        for name, value in record["counts"].items():
+            st.caption(f"{name}: {value}")
+
+        st.caption("最近运行 (ms)")
+        st.bar_chart([r["total_ms"] for r in history], height=120)
+
+        st.button("🔬 分析下一次运行 (cProfile)", on_click=_request_profile, key="_perf_profile_button")
+        if "_perf_profile" in st.session_state:
+            st.code(st.session_state["_perf_profile"], language=None)
@@ -0,0 +1,142 @@
+import argparse
+import csv
+import json
+import os
+
+from recipe_store import RECIPE_FILE, iter_recipes
+from storage import LINE_KEY_TO_COLUMN, RECIPE_COLUMNS, RECIPE_INGREDIENT_COLUMNS, RECIPE_KEY_TO_COLUMN
+
+# Flat copies of recipes.json for BI tools:
+#   python recipe_export.py          only recipes whose 修改时间 moved
+#   python recipe_export.py --full   rewrite both files
+RECIPES_CSV = "recipes.csv"
+RECIPE_INGREDIENTS_CSV = "recipe_ingredients.csv"
+# 修改时间 of every exported recipe, plus the newest one as the watermark
+WATERMARK_FILE = "recipes_export.watermark.json"
+
+_RECIPE_KEYS = {col: key for key, col in RECIPE_KEY_TO_COLUMN.items()}
+_LINE_KEYS = {col: key for key, col in LINE_KEY_TO_COLUMN.items()}
+
+
+def _cell(value):
+    return "" if value is None else value
+
+
+def recipe_row(recipe):
+    return [_cell(recipe.get(_RECIPE_KEYS[col])) for col in RECIPE_COLUMNS]
+
+
+def line_rows(recipe):
+    rid = recipe.get("编号")
+    for ing in recipe.get("食材", []):
+        yield [rid] + [_cell(ing.get(_LINE_KEYS[col])) for col in RECIPE_INGREDIENT_COLUMNS[1:]]
+
+
+def _read_watermark(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _has_header(path, columns):
+    if not os.path.exists(path):
+        return False
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), None) == columns
+
+
+def _copy_rows(path, writer, drop_ids):
+    """Stream the rows of an earlier export into `writer`, minus `drop_ids`."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row and row[0] not in drop_ids:
+                writer.writerow(row)
+
+
+def _rewrite(recipes_csv, lines_csv, drop_ids, recipes):
+    """Rewrite both tables: earlier rows minus `drop_ids` (None = start over),
+    then the rows of `recipes`, written as they are streamed in."""
+    tmp_recipes, tmp_lines = recipes_csv + ".tmp", lines_csv + ".tmp"
+    with open(tmp_recipes, "w", encoding="utf-8-sig", newline="") as rf, \
+            open(tmp_lines, "w", encoding="utf-8-sig", newline="") as lf:
+        recipe_writer, line_writer = csv.writer(rf), csv.writer(lf)
+        recipe_writer.writerow(RECIPE_COLUMNS)
+        line_writer.writerow(RECIPE_INGREDIENT_COLUMNS)
+        if drop_ids is not None:
+            _copy_rows(recipes_csv, recipe_writer, drop_ids)
+            _copy_rows(lines_csv, line_writer, drop_ids)
+        for recipe in recipes:
+            recipe_writer.writerow(recipe_row(recipe))
+            line_writer.writerows(line_rows(recipe))
+    os.replace(tmp_recipes, recipes_csv)
+    os.replace(tmp_lines, lines_csv)
+
+
+def export_recipes(path=RECIPE_FILE, recipes_csv=RECIPES_CSV, lines_csv=RECIPE_INGREDIENTS_CSV,
+                   watermark_path=WATERMARK_FILE, full=False):
+    """Write recipes.csv / recipe_ingredients.csv from the recipes at `path`.
+
+    Recipes are streamed (recipe_store.iter_recipes). Incremental unless
+    `full` (or there is no usable earlier export): one pass reads only 编号 /
+    修改时间, then just the recipes that are new or whose 修改时间 differs
+    from the last export are read and rewritten, and deleted ones dropped.
+    Returns {"mode", "exported", "deleted", "unchanged"}.
+    """
+    previous = None if full else _read_watermark(watermark_path)
+    if previous is not None and not (
+        _has_header(recipes_csv, RECIPE_COLUMNS) and _has_header(lines_csv, RECIPE_INGREDIENT_COLUMNS)
+    ):
+        previous = None
+
+    current = {}
+    if previous is None:
+        def everything():
+            for recipe in iter_recipes(path):
+                current[recipe.get("编号")] = recipe.get("修改时间")
+                yield recipe
+        _rewrite(recipes_csv, lines_csv, None, everything())
+        changed, deleted = current, []
+    else:
+        for r in iter_recipes(path, fields=["编号", "修改时间"]):
+            current[r.get("编号")] = r.get("修改时间")
+        exported = previous.get("recipes", {})
+        changed = {rid for rid, stamp in current.items() if rid not in exported or exported[rid] != stamp}
+        deleted = [rid for rid in exported if rid not in current]
+        if changed or deleted:
+            _rewrite(recipes_csv, lines_csv, changed | set(deleted), iter_recipes(path, ids=changed))
+
+    stamps = [t for t in current.values() if t]
+    tmp_path = watermark_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"watermark": max(stamps, default=None), "recipes": current}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, watermark_path)
+
+    return {
+        "mode": "full" if previous is None else "incremental",
+        "exported": len(changed),
+        "deleted": len(deleted),
+        "unchanged": len(current) - len(changed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export recipes.json to recipes.csv + recipe_ingredients.csv")
+    parser.add_argument("--full", action="store_true", help="rewrite everything, ignoring the watermark")
+    parser.add_argument("--recipes", default=RECIPE_FILE)
+    args = parser.parse_args()
+
+    stats = export_recipes(args.recipes, full=args.full)
+    print(
+        f"✅ {stats['mode']} export: {stats['exported']} recipes written, "
+        f"{stats['deleted']} removed, {stats['unchanged']} unchanged"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+
+# path to recipes
+RECIPE_FILE = "recipes.json"
+
+# Recipe edits are appended here as JSON lines and folded back into
+# recipes.json once the journal outgrows COMPACT_MIN_BYTES and
+# COMPACT_RATIO x the snapshot size. Its first line names the snapshot
+# (sha1) it applies to, so a journal already folded into a newer snapshot
+# is never replayed over it.
+JOURNAL_SUFFIX = ".journal.jsonl"
+COMPACT_MIN_BYTES = 256 * 1024
+COMPACT_RATIO = 0.5
+
+# Sidecar index: byte offset/length and 分类 of every recipe in the snapshot,
+# so one recipe (or one category) is read without parsing the whole file
+OFFSETS_SUFFIX = ".offsets.json"
+STREAM_CHUNK = 64 * 1024
+
+# Process-wide cache: (absolute path, index class) -> (signature, RecipeIndex)
+_INDEX_CACHE = {}
+# absolute path -> RecipeOffsets
+_OFFSETS_CACHE = {}
+# absolute path -> (signature, sha1 of the snapshot)
+_GENERATION_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_WRITE_LOCK = threading.Lock()
+_INSERT_LOCK = threading.Lock()
+
+_RECIPE_ID = re.compile(r"^RC-(\d+)$")
+
+# How a recipe without a 分类 (None / "") is listed and filtered
+UNCATEGORIZED = "未分类"
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def journal_path(path=RECIPE_FILE):
+    return path + JOURNAL_SUFFIX
+
+
+def _recipes_signature(path):
+    """Snapshot + journal signature; changes when either file does."""
+    journal = journal_path(path)
+    return (
+        _file_signature(path) if os.path.exists(path) else None,
+        _file_signature(journal) if os.path.exists(journal) else None,
+    )
+
+
+def _read_snapshot(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _replay(recipes, entries):
+    """Apply journal entries in order. Replaying twice gives the same result."""
+    position = {r.get("编号"): i for i, r in enumerate(recipes)}
+    deleted = False
+    for entry in entries:
+        rid = entry.get("编号")
+        if entry.get("op") == "upsert":
+            if rid in position and recipes[position[rid]] is not None:
+                recipes[position[rid]] = entry["recipe"]
+            else:
+                position[rid] = len(recipes)
+                recipes.append(entry["recipe"])
+        elif entry.get("op") == "delete" and rid in position:
+            recipes[position.pop(rid)] = None
+            deleted = True
+    if deleted:
+        recipes = [r for r in recipes if r is not None]
+    return recipes
+
+
+class _HashingWriter:
+    """Write-through file wrapper that hashes the bytes written."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha1 = hashlib.sha1()
+
+    def write(self, data):
+        self.sha1.update(data)
+        return self.f.write(data)
+
+
+def snapshot_generation(path=RECIPE_FILE):
+    """sha1 of the recipes.json snapshot (None when there is none).
+
+    The journal's first line names the generation it applies to. Cached per
+    file signature, so it is only hashed again after the file changes.
+    """
+    if not os.path.exists(path):
+        return None
+    key, signature = os.path.abspath(path), _file_signature(path)
+    with _CACHE_LOCK:
+        cached = _GENERATION_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK), b""):
+            sha1.update(chunk)
+    with _CACHE_LOCK:
+        _GENERATION_CACHE[key] = (signature, sha1.hexdigest())
+    return sha1.hexdigest()
+
+
+def _journal_base(journal):
+    """The snapshot generation a journal's header names; "" for a journal without one."""
+    with open(journal, "r", encoding="utf-8") as f:
+        try:
+            first = json.loads(f.readline() or "{}")
+        except json.JSONDecodeError:
+            return ""
+    return first.get("snapshot") if first.get("op") == "base" else ""
+
+
+def _read_journal(path):
+    journal = journal_path(path)
+    if not os.path.exists(journal):
+        return []
+    entries = []
+    with open(journal, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-append; everything before it is valid
+                print(f"⚠️ Skipping unreadable journal line in {journal}")
+    if entries and entries[0].get("op") == "base":
+        if entries[0].get("snapshot") != snapshot_generation(path):
+            # save_recipes died after writing the snapshot that already holds these
+            return []
+        entries = entries[1:]
+    return entries
+
+
+def load_recipes(path=RECIPE_FILE):
+    """recipes.json snapshot with the journal replayed on top."""
+    return _replay(_read_snapshot(path), _read_journal(path))
+
+
+def _dump_snapshot(recipes, f):
+    """Write `recipes` like json.dump(indent=2) and return each one's (offset, length).
+
+    Elements are serialized one by one so their byte positions are known
+    without reading the file back.
+    """
+    if not recipes:
+        f.write(b"[]")
+        return []
+    spans = []
+    position = f.write(b"[\n  ")
+    for i, recipe in enumerate(recipes):
+        if i:
+            position += f.write(b",\n  ")
+        # Nested lines get the list's indent too, exactly as json.dump does
+        data = json.dumps(recipe, ensure_ascii=False, indent=2, default=_json_default)
+        data = data.replace("\n", "\n  ").encode("utf-8")
+        spans.append((position, len(data)))
+        position += f.write(data)
+    f.write(b"\n]")
+    return spans
+
+
+def save_recipes(recipes, path=RECIPE_FILE):
+    """Write a fresh snapshot and drop the journal it supersedes."""
+    with _WRITE_LOCK:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            writer = _HashingWriter(f)
+            spans = _dump_snapshot(recipes, writer)
+        os.replace(tmp_path, path)
+        with _CACHE_LOCK:
+            _GENERATION_CACHE[os.path.abspath(path)] = (_file_signature(path), writer.sha1.hexdigest())
+        # A crash before this line leaves a journal whose header names the old
+        # snapshot; readers skip it instead of replaying it over this one
+        if os.path.exists(journal_path(path)):
+            os.remove(journal_path(path))
+        _write_offsets(path, RecipeOffsets(
+            _file_signature(path),
+            [(r.get("编号"), offset, length, r.get("分类")) for r, (offset, length) in zip(recipes, spans)],
+        ))
+    # Costs/timestamps don't change which recipe uses which ingredient or
+    # image, but the lists might have; rebuild from what we just wrote.
+    remember_index(path, IngredientIndex(recipes))
+    remember_index(path, ImageIndex(recipes))
+
+
+def append_recipe_changes(upserts=(), deletes=(), path=RECIPE_FILE):
+    """Journal recipe upserts/deletes; cost is proportional to the change."""
+    entries = [{"op": "upsert", "编号": r.get("编号"), "recipe": r} for r in upserts]
+    entries += [{"op": "delete", "编号": rid} for rid in deletes]
+    if not entries:
+        return
+
+    with _WRITE_LOCK:
+        signature_before = _recipes_signature(path)
+        journal = journal_path(path)
+        generation = snapshot_generation(path)
+        if os.path.exists(journal) and _journal_base(journal) not in ("", generation):
+            os.remove(journal)  # left by a crashed save_recipes; its snapshot holds these entries
+        if not os.path.exists(journal) or os.path.getsize(journal) == 0:
+            entries.insert(0, {"op": "base", "snapshot": generation})
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, ensure_ascii=False, default=_json_default) + "\n" for e in entries))
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Keep the cached reverse indexes in step with the journal (if they were current)
+    for cls in (IngredientIndex, ImageIndex):
+        with _CACHE_LOCK:
+            cached = _INDEX_CACHE.get((os.path.abspath(path), cls))
+        if cached is not None and cached[0] == signature_before:
+            index = cached[1]
+            for r in upserts:
+                index.add_recipe(r)
+            for rid in deletes:
+                index.remove_recipe(rid)
+            remember_index(path, index)
+
+    if needs_compaction(path):
+        compact_recipes(path)
+
+
+def category_label(category):
+    """分类 as shown and filtered on: missing ones become UNCATEGORIZED."""
+    return category or UNCATEGORIZED
+
+
+def next_recipe_id(existing_ids):
+    """One past the highest RC-xxxx in use (a count + 1 collides after a delete)."""
+    highest = 0
+    for rid in existing_ids:
+        match = _RECIPE_ID.match(str(rid or ""))
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return f"RC-{highest + 1:04d}"
+
+
+def insert_recipe(recipe, path=RECIPE_FILE):
+    """Journal a new recipe; ValueError if its 编号 is already taken."""
+    rid = recipe.get("编号")
+    with _INSERT_LOCK:
+        if get_recipe(rid, path) is not None:
+            raise ValueError(f"菜谱编号 {rid} 已存在")
+        append_recipe_changes(upserts=[recipe], path=path)
+
+
+def needs_compaction(path=RECIPE_FILE):
+    journal = journal_path(path)
+    if not os.path.exists(journal):
+        return False
+    journal_size = os.path.getsize(journal)
+    snapshot_size = os.path.getsize(path) if os.path.exists(path) else 0
+    return journal_size >= COMPACT_MIN_BYTES and journal_size >= snapshot_size * COMPACT_RATIO
+
+
+def compact_recipes(path=RECIPE_FILE):
+    """Fold the journal into a fresh recipes.json snapshot."""
+    if not os.path.exists(journal_path(path)):
+        return False
+    save_recipes(load_recipes(path), path)
+    return True
+
+
+def _json_default(value):
+    # numpy scalars coming back from st.data_editor
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# --- Streaming reads ---
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def _iter_snapshot(path, chunk_size=STREAM_CHUNK):
+    """Yield (offset, length, recipe) for each element of the JSON array at `path`.
+
+    Reads `chunk_size` bytes at a time and decodes one recipe at a time, so
+    memory holds one recipe plus a chunk, not the whole menu.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "rb") as f:
+        start = len(codecs.BOM_UTF8) if f.read(3) == codecs.BOM_UTF8 else 0
+        f.seek(start)
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        buf, pos, eof = "", 0, False  # `start` is the byte offset of buf[0]
+
+        def read_more():
+            nonlocal buf, eof
+            data = f.read(chunk_size)
+            eof = not data
+            buf += utf8.decode(data, final=eof)
+
+        # Opening bracket
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                break
+            read_more()
+        if pos == len(buf):
+            return  # empty file
+        if buf[pos] != "[":
+            raise ValueError(f"{path} is not a JSON array")
+        pos += 1
+
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos == len(buf):
+                if eof:
+                    raise ValueError(f"{path} ends before the closing ]")
+                read_more()
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                recipe, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                read_more()  # the recipe continues in the next chunk
+                continue
+            # Everything before `pos` since the last recipe is ASCII , and whitespace
+            length = len(buf[pos:end].encode("utf-8"))
+            yield start + pos, length, recipe
+            start += pos + length
+            buf, pos = buf[end:], 0
+
+
+class RecipeOffsets:
+    """Sidecar index of the snapshot: [(编号, offset, length, 分类)] in file order."""
+
+    def __init__(self, signature, entries):
+        self.signature = tuple(signature) if signature else None
+        self.entries = [tuple(e) for e in entries]
+        # Duplicate 编号s: the last one wins, as in _replay
+        self.position = {entry[0]: i for i, entry in enumerate(self.entries)}
+
+
+def offsets_path(path=RECIPE_FILE):
+    return path + OFFSETS_SUFFIX
+
+
+def _write_offsets(path, offsets):
+    tmp_path = offsets_path(path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"signature": offsets.signature, "recipes": offsets.entries}, f, ensure_ascii=False)
+    os.replace(tmp_path, offsets_path(path))
+    with _CACHE_LOCK:
+        _OFFSETS_CACHE[os.path.abspath(path)] = offsets
+
+
+def load_recipe_offsets(path=RECIPE_FILE):
+    """RecipeOffsets for the current snapshot, rebuilt with one streaming pass if stale."""
+    if not os.path.exists(path):
+        return RecipeOffsets(None, [])
+    signature = _file_signature(path)
+    key = os.path.abspath(path)
+    with _CACHE_LOCK:
+        cached = _OFFSETS_CACHE.get(key)
+    if cached is not None and cached.signature == signature:
+        return cached
+
+    if os.path.exists(offsets_path(path)):
+        try:
+            with open(offsets_path(path), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if tuple(data.get("signature") or ()) == signature:
+                offsets = RecipeOffsets(signature, data["recipes"])
+                with _CACHE_LOCK:
+                    _OFFSETS_CACHE[key] = offsets
+                return offsets
+        except (OSError, ValueError, KeyError):
+            pass  # rebuilt below
+
+    offsets = RecipeOffsets(signature, [
+        (recipe.get("编号"), offset, length, recipe.get("分类"))
+        for offset, length, recipe in _iter_snapshot(path)
+    ])
+    _write_offsets(path, offsets)
+    return offsets
+
+
+def _journal_overlay(snapshot_ids, entries):
+    """_replay on 编号s only: ({snapshot position: recipe or None}, appended recipes or None)."""
+    position = {rid: i for i, rid in enumerate(snapshot_ids)}
+    slots, tail, tail_position = {}, [], {}
+    for entry in entries:
+        rid = entry.get("编号")
+        if entry.get("op") == "upsert":
+            if rid in position:
+                slots[position[rid]] = entry["recipe"]
+            elif rid in tail_position:
+                tail[tail_position[rid]] = entry["recipe"]
+            else:
+                tail_position[rid] = len(tail)
+                tail.append(entry["recipe"])
+        elif entry.get("op") == "delete":
+            if rid in position:
+                slots[position.pop(rid)] = None
+            elif rid in tail_position:
+                tail[tail_position.pop(rid)] = None
+    return slots, tail
+
+
+def _read_at(f, offset, length):
+    f.seek(offset)
+    return json.loads(f.read(length).decode("utf-8"))
+
+
+def iter_recipes(path=RECIPE_FILE, fields=None, category=None, ids=None):
+    """Recipes one at a time, in load_recipes() order, journal included.
+
+    `fields` keeps only those keys; `category` (分类, compared through
+    category_label so UNCATEGORIZED matches a missing one) and `ids`
+    (编号s) filter. With a filter only the matching recipes are read, by
+    seeking to their offsets; otherwise the snapshot is streamed front to back.
+    """
+    ids = set(ids) if ids is not None else None
+    if category is not None:
+        category = category_label(category)
+
+    def wanted(rid, recipe_category):
+        return (ids is None or rid in ids) and (category is None or category_label(recipe_category) == category)
+
+    def project(recipe):
+        return recipe if fields is None else {k: recipe[k] for k in fields if k in recipe}
+
+    offsets = load_recipe_offsets(path)
+    slots, tail = _journal_overlay([e[0] for e in offsets.entries], _read_journal(path))
+
+    if offsets.entries:
+        with open(path, "rb") as f:
+            if ids is None and category is None:
+                snapshot = (recipe for _, _, recipe in _iter_snapshot(path))
+            else:
+                snapshot = None
+            for i, (rid, offset, length, recipe_category) in enumerate(offsets.entries):
+                recipe = next(snapshot) if snapshot is not None else None
+                if i in slots:
+                    recipe = slots[i]
+                    if recipe is None or not wanted(recipe.get("编号"), recipe.get("分类")):
+                        continue
+                elif not wanted(rid, recipe_category):
+                    continue
+                elif recipe is None:
+                    recipe = _read_at(f, offset, length)
+                yield project(recipe)
+
+    for recipe in tail:
+        if recipe is not None and wanted(recipe.get("编号"), recipe.get("分类")):
+            yield project(recipe)
+
+
+def get_recipe(rid, path=RECIPE_FILE):
+    """One recipe by 编号 (None if missing) without parsing the rest of the file."""
+    for entry in reversed(_read_journal(path)):
+        if entry.get("编号") == rid:
+            return entry["recipe"] if entry.get("op") == "upsert" else None
+    offsets = load_recipe_offsets(path)
+    i = offsets.position.get(rid)
+    if i is None:
+        return None
+    _, offset, length, _ = offsets.entries[i]
+    with open(path, "rb") as f:
+        return _read_at(f, offset, length)
+
+
+def recipe_categories(path=RECIPE_FILE):
+    """分类 values in first-seen order, from the sidecar index + journal."""
+    offsets = load_recipe_offsets(path)
+    slots, tail = _journal_overlay([e[0] for e in offsets.entries], _read_journal(path))
+    categories = {}
+    for i, entry in enumerate(offsets.entries):
+        if i in slots:
+            if slots[i] is not None:
+                categories.setdefault(slots[i].get("分类"), None)
+        else:
+            categories.setdefault(entry[3], None)
+    for recipe in tail:
+        if recipe is not None:
+            categories.setdefault(recipe.get("分类"), None)
+    return list(categories)
+
+
+class RecipeIndex:
+    """Reverse index: key -> recipe 编号s; subclasses say which keys a recipe has."""
+
+    FIELDS = None  # recipe fields keys_of reads (None = all)
+
+    def __init__(self, recipes=()):
+        self._recipes_by_key = {}
+        self._keys_by_recipe = {}
+        for recipe in recipes:
+            self.add_recipe(recipe)
+
+    def keys_of(self, recipe):
+        raise NotImplementedError
+
+    def add_recipe(self, recipe):
+        rid = recipe.get("编号")
+        self.remove_recipe(rid)
+        keys = self.keys_of(recipe)
+        self._keys_by_recipe[rid] = keys
+        for key in keys:
+            self._recipes_by_key.setdefault(key, set()).add(rid)
+
+    def remove_recipe(self, rid):
+        for key in self._keys_by_recipe.pop(rid, ()):
+            users = self._recipes_by_key.get(key)
+            if users:
+                users.discard(rid)
+                if not users:
+                    del self._recipes_by_key[key]
+
+    def recipes_using(self, keys):
+        """Recipe 编号s that use any of `keys`."""
+        affected = set()
+        for key in keys:
+            affected |= self._recipes_by_key.get(key, set())
+        return affected
+
+    def __contains__(self, key):
+        return key in self._recipes_by_key
+
+
+class IngredientIndex(RecipeIndex):
+    """Reverse index: ingredient 编号 -> recipe 编号s that use it."""
+
+    FIELDS = ["编号", "食材"]
+
+    def keys_of(self, recipe):
+        return {
+            ing.get("编号") for ing in recipe.get("食材", [])
+            if ing.get("编号") and ing.get("编号") != "WASTE"
+        }
+
+
+class ImageIndex(RecipeIndex):
+    """Reverse index: uploaded image name -> recipe 编号s that show it."""
+
+    FIELDS = ["编号", "主图", "步骤"]
+
+    def keys_of(self, recipe):
+        # image name -> where it is used ("主图", "步骤 2", ...)
+        places = {}
+        if recipe.get("主图"):
+            places.setdefault(recipe["主图"], []).append("主图")
+        for i, step in enumerate(recipe.get("步骤") or []):
+            if step.get("图片名"):
+                places.setdefault(step["图片名"], []).append(f"步骤 {i + 1}")
+        return places
+
+    def names(self):
+        return set(self._recipes_by_key)
+
+    def references(self, name):
+        """[(recipe 编号, place)] for every use of image `name`."""
+        return sorted(
+            (rid, place)
+            for rid in self._recipes_by_key.get(name, ())
+            for place in self._keys_by_recipe[rid][name]
+        )
+
+
+def _load_index(cls, path, recipes):
+    signature = _recipes_signature(path)
+    if signature == (None, None):
+        return cls()
+
+    key = (os.path.abspath(path), cls)
+    with _CACHE_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+    if recipes is None:
+        recipes = iter_recipes(path, fields=cls.FIELDS)
+    index = cls(recipes)
+    with _CACHE_LOCK:
+        _INDEX_CACHE[key] = (signature, index)
+    return index
+
+
+def load_ingredient_index(path=RECIPE_FILE, recipes=None):
+    """Cached IngredientIndex for `path`, rebuilt only when the file changed.
+
+    Pass `recipes` when they are already loaded; otherwise a miss streams
+    just the fields the index needs.
+    """
+    return _load_index(IngredientIndex, path, recipes)
+
+
+def load_image_index(path=RECIPE_FILE, recipes=None):
+    """Cached ImageIndex for `path`; a miss streams only 编号 / 主图 / 步骤."""
+    return _load_index(ImageIndex, path, recipes)
+
+
+def remember_index(path, index):
+    """Store `index` as current for the file just written at `path`."""
+    with _CACHE_LOCK:
+        _INDEX_CACHE[(os.path.abspath(path), type(index))] = (_recipes_signature(path), index)
+
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from cost_engine import CostMatrix
+
+# What an adjustment can target: 编号 (one ingredient), 食材分类 or 供应商
+ADJUST_FIELDS = ["编号", "食材分类", "供应商"]
+
+# Columns of the scenario editor table: one row per adjustment
+SCENARIO_COLUMNS = ["情景", "类型", "值", "调整%"]
+
+RESULT_COLUMNS = [
+    "情景", "编号", "中文名", "英文名", "售价",
+    "原成本", "新成本", "成本变化", "原成本百分比", "新成本百分比", "百分比变化",
+]
+
+
+def scenarios_from_table(table):
+    """Editor rows (情景 / 类型 / 值 / 调整%) -> {scenario name: [(field, value, percent)]}.
+
+    Incomplete rows are ignored; scenarios keep the order they first appear in.
+    """
+    scenarios = {}
+    for row in table.to_dict("records"):
+        name, field, value, percent = (row.get(c) for c in SCENARIO_COLUMNS)
+        if not name or field not in ADJUST_FIELDS or value in (None, "") or pd.isna(percent):
+            continue
+        scenarios.setdefault(str(name).strip(), []).append((field, str(value).strip(), float(percent)))
+    return scenarios
+
+
+class ScenarioRunner:
+    """Cost the whole menu under many price scenarios at once.
+
+    The recipe × ingredient matrix and the current price vector are built once;
+    each scenario is one column of factors on that vector, so dozens of
+    scenarios are a single sparse product. Nothing is written back: the
+    recipes and the catalog are only read.
+    """
+
+    def __init__(self, recipes, catalog):
+        self.recipes = recipes
+        self.costs = CostMatrix(recipes)
+        self.base_prices, known = self.costs.price_vector(catalog.unit_prices)
+
+        # Lines whose ingredient is no longer in the DB keep their stored 小计
+        # (like CostMatrix.apply) and no adjustment reaches them
+        unknown_lines = ~known[self.costs.cols]
+        self.fixed = np.bincount(
+            self.costs.rows,
+            weights=np.where(unknown_lines, np.nan_to_num(self.costs.old_subtotals), 0.0),
+            minlength=len(recipes),
+        )
+
+        # 编号 / 食材分类 / 供应商 per matrix column as integer codes, so
+        # matching an adjustment is one integer comparison per ingredient
+        rows = [catalog.get(s, {}) for s in self.costs.serials]
+        self.codes = {}
+        for field in ADJUST_FIELDS:
+            values = self.costs.serials if field == "编号" else [row.get(field, "") for row in rows]
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+            self.codes[field] = (codes, {v: i for i, v in enumerate(uniques)})
+
+        self.meta = pd.DataFrame({
+            "编号": [r.get("编号") for r in recipes],
+            "中文名": [r.get("中文名", "") for r in recipes],
+            "英文名": [r.get("英文名", "") for r in recipes],
+            "售价": self.costs.sale_prices,
+        })
+
+    def factors(self, adjustments):
+        """Price multiplier per ingredient; several matching adjustments compound."""
+        factors = np.ones(len(self.costs.serials))
+        for field, value, percent in adjustments:
+            codes, lookup = self.codes[field]
+            factors[codes == lookup.get(value, -2)] *= 1 + percent / 100
+        return factors
+
+    def price_matrix(self, scenarios):
+        """(ingredients × scenarios) prices, one column per scenario in order."""
+        if not scenarios:
+            return np.empty((len(self.base_prices), 0))
+        factors = np.column_stack([self.factors(adj) for adj in scenarios.values()])
+        return self.base_prices[:, None] * factors
+
+    def run(self, scenarios):
+        """Per-recipe cost and 成本百分比 under each scenario, biggest impact first.
+
+        Costs are unrounded line sums for both the baseline and the scenario,
+        so the deltas come from the adjustments only (stored 总成本 rounds each
+        line first and can differ by a few fen). Returns a DataFrame with
+        RESULT_COLUMNS, sorted by scenario then by |成本变化|.
+        """
+        if not scenarios:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        return self.compare(list(scenarios), self.price_matrix(scenarios))
+
+    def compare(self, names, prices):
+        """run() for ready-made prices: one column of `prices` (aligned with
+        `self.costs.serials`) per name in `names`."""
+        if not names or not self.recipes:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+
+        base = self.costs.totals(self.base_prices) + self.fixed
+        new = self.costs.totals(prices) + self.fixed[:, None]
+        sale = self.costs.sale_prices
+        with np.errstate(divide="ignore", invalid="ignore"):
+            base_pct = np.where(sale > 0, base / sale * 100, 0.0)
+            new_pct = np.where(sale[:, None] > 0, new / sale[:, None] * 100, 0.0)
+
+        # Biggest |成本变化| first within each scenario, in one numpy sort
+        delta = new - base[:, None]
+        n, k = new.shape
+        order = np.lexsort((-np.abs(delta).T.ravel(), np.repeat(np.arange(k), n)))
+        recipe_idx = np.tile(np.arange(n), k)[order]
+        scenario_idx = np.repeat(np.arange(k), n)[order]
+        pct_delta = new_pct - base_pct[:, None]
+
+        result = self.meta.iloc[recipe_idx].reset_index(drop=True)
+        result.insert(0, "情景", pd.Categorical.from_codes(scenario_idx, categories=names, ordered=True))
+        for col, values in [
+            ("原成本", base[recipe_idx]),
+            ("新成本", new.T.ravel()[order]),
+            ("成本变化", delta.T.ravel()[order]),
+            ("原成本百分比", base_pct[recipe_idx]),
+            ("新成本百分比", new_pct.T.ravel()[order]),
+            ("百分比变化", pct_delta.T.ravel()[order]),
+        ]:
+            result[col] = np.round(values, 2)
+        return result[RESULT_COLUMNS]
+
+
+def _largest_change(changes):
+    """The signed change with the largest magnitude (a -30 cut beats a +5 rise)."""
+    values = changes.to_numpy(dtype=float)
+    return values[np.abs(values).argmax()]
+
+
+def summarize(result):
+    """One row per scenario: recipes affected, total and largest cost change.
+
+    The 最大 columns hold the change with the largest magnitude, sign kept.
+    """
+    if result.empty:
+        return pd.DataFrame(columns=["情景", "受影响配方", "总成本变化", "最大成本变化", "最大百分比变化"])
+    grouped = result.groupby("情景", observed=True, sort=True)
+    summary = pd.DataFrame({
+        "受影响配方": grouped["成本变化"].apply(lambda s: int((s != 0).sum())),
+        "总成本变化": grouped["成本变化"].sum().round(2),
+        "最大成本变化": grouped["成本变化"].agg(_largest_change),
+        "最大百分比变化": grouped["百分比变化"].agg(_largest_change),
+    })
+    return summary.reset_index()
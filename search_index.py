@@ -0,0 +1,111 @@
+import unicodedata
+
+from catalog import cached_per_version
+
+# Text columns that are searchable, in ranking priority order
+SEARCH_COLUMNS = ["食材中文名", "食材英文名"]
+
+# Process-wide cache: catalog version -> SearchIndex
+_INDEX_CACHE = {}
+MAX_CACHED_INDEXES = 4
+
+
+def normalize(text):
+    """NFKC (full-width WeChat pastes -> ASCII) + case folding."""
+    if text is None:
+        return ""
+    return unicodedata.normalize("NFKC", str(text)).casefold().strip()
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SearchIndex:
+    """Character n-gram index over ingredient names.
+
+    Unigrams and bigrams are indexed so single Chinese characters and any
+    longer substring can be looked up; candidates are then verified with a
+    plain substring test, so results match `str.contains` semantics.
+    """
+
+    def __init__(self, df):
+        self.serials = df["编号"].tolist()
+        # Missing names (NaN in the typed catalog) index as ""
+        columns = [
+            df[col].fillna("").astype(str).tolist() if col in df.columns else [""] * len(df)
+            for col in SEARCH_COLUMNS
+        ]
+        # Normalized text per row and per field, e.g. ["牛舌 【beef tongue】", "beef tongue"]
+        self.fields = [[normalize(v) for v in values] for values in zip(*columns)]
+        self.texts = ["\n".join(f) for f in self.fields]
+
+        self.postings = {}
+        for pos, text in enumerate(self.texts):
+            for gram in _grams(text, 1) | _grams(text, 2):
+                if gram != "\n":
+                    self.postings.setdefault(gram, set()).add(pos)
+
+    def _candidates(self, term):
+        grams = _grams(term, 2) if len(term) > 1 else {term}
+        result = None
+        # Intersect from the rarest gram up
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            result = set(posting) if result is None else result & posting
+            if not result:
+                break
+        return result or set()
+
+    def search(self, query, limit=None):
+        """Ranked 编号s whose names contain the query (or all of its words)."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        terms = query.split()
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._candidates(term)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+
+        ranked = []
+        for pos in candidates:
+            text = self.texts[pos]
+            if not all(term in text for term in terms):
+                continue
+            ranked.append((self._score(pos, query), pos))
+        ranked.sort()
+
+        seen, hits = set(), []
+        for _, pos in ranked:
+            serial = self.serials[pos]
+            if serial not in seen:
+                seen.add(serial)
+                hits.append(serial)
+                if limit and len(hits) >= limit:
+                    break
+        return hits
+
+    def _score(self, pos, query):
+        # Lower is better: exact name, then prefix, then whole phrase, then words;
+        # Chinese name before English, shorter names first
+        for field_rank, field in enumerate(self.fields[pos]):
+            if field == query:
+                return (0, field_rank, len(field), pos)
+        for field_rank, field in enumerate(self.fields[pos]):
+            if field.startswith(query):
+                return (1, field_rank, len(field), pos)
+        for field_rank, field in enumerate(self.fields[pos]):
+            if query in field:
+                return (2, field_rank, len(field), pos)
+        return (3, 0, len(self.texts[pos]), pos)
+
+
+def get_search_index(catalog):
+    """SearchIndex for a Catalog, rebuilt only when the catalog version changes."""
+    return cached_per_version(catalog, lambda c: SearchIndex(c.typed), _INDEX_CACHE, MAX_CACHED_INDEXES)
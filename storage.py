@@ -0,0 +1,580 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from backup_store import BACKUP_DIR, TIMESTAMP_FORMAT, extract_file, find_snapshot, restore, snapshot
+from catalog import Catalog, load_catalog, invalidate_catalog, DATA_FILE
+from helper_functions import clean_ingredient_df
+from price_history import HISTORY_FILE, load_history, record_prices, seed_history
+from store_prices import STORE_DIR, list_stores, load_overlay, save_overlay, store_catalog
+from recipe_store import (
+    RECIPE_FILE, IngredientIndex, ImageIndex, load_recipes, save_recipes, load_ingredient_index, load_image_index,
+    UNCATEGORIZED, append_recipe_changes, journal_path, insert_recipe, next_recipe_id, iter_recipes, get_recipe, recipe_categories,
+)
+
+# Which backend the pages use: "file" (ingredients.csv + recipes.json) or "sqlite"
+STORAGE_ENV = "RECIPE_APP_STORAGE"
+DB_ENV = "RECIPE_APP_DB"
+DB_FILE = "recipes.db"
+
+# Column names (in Chinese), same order as ingredients.csv
+INGREDIENT_COLUMNS = [
+    "编号", "供应商", "食材英文名", "食材中文名", "食材分类",
+    "单位", "单位价格", "单位容量", "基础单位价格", "创建时间", "修改时间",
+]
+
+# recipes.csv layout, plus the recipe fields that only live in recipes.json
+RECIPE_COLUMNS = [
+    "食谱编号", "食谱英文名", "食谱中文名", "售价", "总成本", "成本百分比", "创建时间", "修改时间",
+]
+RECIPE_EXTRA_COLUMNS = ["分类", "备注", "主图", "SKUID", "步骤", "其他"]
+
+# recipe_ingredients.csv layout, plus position, note and leftover keys
+RECIPE_INGREDIENT_COLUMNS = ["食谱编号", "食材编号", "食材中文名", "用量", "单位", "单价", "小计"]
+RECIPE_INGREDIENT_EXTRA_COLUMNS = ["行号", "备注", "其他"]
+
+# recipes.json key <-> recipes table column
+RECIPE_KEY_TO_COLUMN = {
+    "编号": "食谱编号", "英文名": "食谱英文名", "中文名": "食谱中文名",
+    "售价": "售价", "总成本": "总成本", "成本百分比": "成本百分比",
+    "创建时间": "创建时间", "修改时间": "修改时间",
+    "分类": "分类", "备注": "备注", "主图": "主图", "SKUID": "SKUID",
+}
+LINE_KEY_TO_COLUMN = {
+    "编号": "食材编号", "食材中文名": "食材中文名", "用量": "用量", "单位": "单位",
+    "单价": "单价", "小计": "小计", "备注": "备注",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingredients (
+    编号 TEXT PRIMARY KEY,
+    供应商 TEXT,
+    食材英文名 TEXT,
+    食材中文名 TEXT,
+    食材分类 TEXT,
+    单位 TEXT,
+    单位价格 REAL,
+    单位容量 REAL,
+    基础单位价格 REAL,
+    创建时间 TEXT,
+    修改时间 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ingredients_category ON ingredients (食材分类);
+
+CREATE TABLE IF NOT EXISTS recipes (
+    食谱编号 TEXT PRIMARY KEY,
+    食谱英文名 TEXT,
+    食谱中文名 TEXT,
+    售价 REAL,
+    总成本 REAL,
+    成本百分比 REAL,
+    创建时间 TEXT,
+    修改时间 TEXT,
+    分类 TEXT,
+    备注 TEXT,
+    主图 TEXT,
+    SKUID TEXT,
+    步骤 TEXT,
+    其他 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_category ON recipes (分类);
+
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    食谱编号 TEXT NOT NULL REFERENCES recipes (食谱编号) ON DELETE CASCADE,
+    行号 INTEGER NOT NULL,
+    食材编号 TEXT,
+    食材中文名 TEXT,
+    用量,
+    单位 TEXT,
+    单价,
+    小计,
+    备注 TEXT,
+    其他 TEXT,
+    PRIMARY KEY (食谱编号, 行号)
+);
+CREATE INDEX IF NOT EXISTS idx_recipe_ingredients_serial ON recipe_ingredients (食材编号);
+"""
+
+
+class FileStorage:
+    """Original flat-file layout: ingredients.csv + recipes.json."""
+
+    name = "file"
+
+    def __init__(self, ingredient_path=DATA_FILE, recipe_path=RECIPE_FILE, backup_dir=BACKUP_DIR,
+                 history_path=None, store_dir=STORE_DIR):
+        self.ingredient_path = ingredient_path
+        self.recipe_path = recipe_path
+        self.backup_dir = backup_dir
+        # Price history belongs to the catalog it records, not to the cwd
+        # (helpers/ scripts run with "../" paths)
+        if history_path is None:
+            history_path = os.path.join(os.path.dirname(ingredient_path), HISTORY_FILE)
+        self.history_path = history_path
+        self.store_dir = store_dir
+
+    # --- Ingredients ---
+    def ensure_ingredients(self):
+        if not os.path.exists(self.ingredient_path):
+            pd.DataFrame(columns=INGREDIENT_COLUMNS).to_csv(self.ingredient_path, index=False)
+
+    def load_catalog(self, store=None):
+        """The shared catalog, or with `store`'s price overrides layered on top."""
+        self.ensure_ingredients()
+        catalog = load_catalog(self.ingredient_path)
+        return catalog if store is None else store_catalog(catalog, self.load_store_overlay(store))
+
+    def save_ingredients(self, df, serials=None, deleted=()):
+        seed_history(self.load_catalog().df, self.history_path)
+        # A CSV can only be rewritten as a whole (deleted rows are already gone from df)
+        df.to_csv(self.ingredient_path, index=False, encoding="utf-8-sig")
+        record_prices(df if serials is None else df[df["编号"].isin(list(serials))], self.history_path)
+
+    def add_ingredient(self, row):
+        self.ensure_ingredients()
+        seed_history(self.load_catalog().df, self.history_path)
+        new_row = pd.DataFrame([[row.get(col, "") for col in INGREDIENT_COLUMNS]], columns=INGREDIENT_COLUMNS)
+        new_row.to_csv(self.ingredient_path, mode="a", header=False, index=False)
+        record_prices(new_row, self.history_path)
+
+    def load_price_history(self):
+        return load_history(self.history_path)
+
+    # --- Stores: per-location price overrides on the shared catalog ---
+    def list_stores(self):
+        return list_stores(self.store_dir)
+
+    def load_store_overlay(self, store):
+        return load_overlay(store, self.store_dir)
+
+    def save_store_overlay(self, store, df):
+        return save_overlay(store, df, self.load_catalog(), self.store_dir)
+
+    # --- Recipes ---
+    def load_recipes(self):
+        return load_recipes(self.recipe_path)
+
+    def iter_recipes(self, fields=None, category=None, ids=None):
+        """Streamed, optionally projected/filtered; see recipe_store.iter_recipes."""
+        return iter_recipes(self.recipe_path, fields, category, ids)
+
+    def get_recipe(self, recipe_id):
+        return get_recipe(recipe_id, self.recipe_path)
+
+    def recipe_categories(self):
+        return recipe_categories(self.recipe_path)
+
+    def next_recipe_id(self):
+        return next_recipe_id(r.get("编号") for r in self.iter_recipes(fields=["编号"]))
+
+    def save_recipes(self, recipes):
+        save_recipes(recipes, self.recipe_path)
+
+    def upsert_recipes(self, updated):
+        # Journaled: only the changed recipes are written
+        append_recipe_changes(upserts=updated, path=self.recipe_path)
+
+    def save_recipe(self, recipe):
+        self.upsert_recipes([recipe])
+
+    def insert_recipe(self, recipe):
+        """Save a new recipe; ValueError if its 编号 exists (save_recipe would replace it)."""
+        insert_recipe(recipe, self.recipe_path)
+
+    def delete_recipe(self, recipe_id):
+        append_recipe_changes(deletes=[recipe_id], path=self.recipe_path)
+
+    def ingredient_index(self, recipes=None):
+        return load_ingredient_index(self.recipe_path, recipes)
+
+    def image_index(self, recipes=None):
+        return load_image_index(self.recipe_path, recipes)
+
+    def data_version(self):
+        """Changes whenever ingredients or recipes change (a few stat calls)."""
+        return (
+            self.load_catalog().version,
+            _file_signature(self.recipe_path),
+            _file_signature(journal_path(self.recipe_path)),
+        )
+
+    # --- Backups ---
+    def _backup_files(self):
+        return {
+            "ingredients": self.ingredient_path,
+            "recipes": self.recipe_path,
+            "journal": journal_path(self.recipe_path),
+        }
+
+    def backup(self, timestamp):
+        # Deduplicated + gzip'd; unchanged files cost nothing
+        return snapshot(self._backup_files(), timestamp, self.backup_dir)
+
+    def restore(self, timestamp=None):
+        snap = restore(timestamp, self._backup_files(), self.backup_dir)
+        invalidate_catalog(self.ingredient_path)
+        return snap
+
+
+class SqliteStorage:
+    """Same data in one SQLite file (WAL mode), so saving a record writes one row."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path=DB_FILE, backup_dir=BACKUP_DIR, history_path=HISTORY_FILE, store_dir=STORE_DIR):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.history_path = history_path
+        self.store_dir = store_dir
+        self._lock = threading.RLock()
+        # Streamlit runs each session in its own thread; share one connection
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._local_writes = 0
+        self._catalog = None
+
+    def data_version(self):
+        with self._lock:
+            return self._version()
+
+    def _version(self):
+        # data_version moves on commits from *other* connections only
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return (data_version, self._local_writes)
+
+    def _write(self, fn):
+        with self._lock:
+            with self._conn:
+                fn(self._conn)
+            self._local_writes += 1
+
+    # --- Ingredients ---
+    def load_catalog(self, store=None):
+        with self._lock:
+            version = self._version()
+            if self._catalog is None or self._catalog.signature != version:
+                df = pd.read_sql_query(
+                    f"SELECT {', '.join(INGREDIENT_COLUMNS)} FROM ingredients ORDER BY rowid", self._conn
+                )
+                df = clean_ingredient_df(df)
+                self._catalog = Catalog(self.db_path, df, version, f"sqlite:{version[0]}:{version[1]}")
+            catalog = self._catalog
+        return catalog if store is None else store_catalog(catalog, self.load_store_overlay(store))
+
+    def save_ingredients(self, df, serials=None, deleted=()):
+        if serials is not None:
+            df = df[df["编号"].isin(list(serials))]
+        rows = _ingredient_rows(df)
+        seed_history(self.load_catalog().df, self.history_path)
+
+        def write(conn):
+            _upsert_ingredients(conn, rows)
+            conn.executemany("DELETE FROM ingredients WHERE 编号 = ?", [(s,) for s in deleted])
+        self._write(write)
+        record_prices(df, self.history_path)
+
+    def add_ingredient(self, row):
+        rows = [tuple(_sql_value(row.get(col)) for col in INGREDIENT_COLUMNS)]
+        seed_history(self.load_catalog().df, self.history_path)
+        self._write(lambda conn: _upsert_ingredients(conn, rows))
+        record_prices(pd.DataFrame([{col: row.get(col, "") for col in INGREDIENT_COLUMNS}]), self.history_path)
+
+    def load_price_history(self):
+        return load_history(self.history_path)
+
+    # --- Stores: per-location price overrides on the shared catalog ---
+    def list_stores(self):
+        return list_stores(self.store_dir)
+
+    def load_store_overlay(self, store):
+        return load_overlay(store, self.store_dir)
+
+    def save_store_overlay(self, store, df):
+        return save_overlay(store, df, self.load_catalog(), self.store_dir)
+
+    # --- Recipes ---
+    def _select_recipes(self, where="", params=()):
+        with self._lock:
+            recipe_rows = self._conn.execute(
+                f"SELECT {', '.join(RECIPE_COLUMNS + RECIPE_EXTRA_COLUMNS)} FROM recipes {where} ORDER BY rowid",
+                params,
+            ).fetchall()
+            line_rows = self._conn.execute(
+                f"SELECT {', '.join(RECIPE_INGREDIENT_COLUMNS + RECIPE_INGREDIENT_EXTRA_COLUMNS)} "
+                f"FROM recipe_ingredients WHERE 食谱编号 IN (SELECT 食谱编号 FROM recipes {where}) "
+                "ORDER BY 食谱编号, 行号",
+                params,
+            ).fetchall()
+
+        lines = {}
+        line_cols = RECIPE_INGREDIENT_COLUMNS + RECIPE_INGREDIENT_EXTRA_COLUMNS
+        for values in line_rows:
+            row = dict(zip(line_cols, values))
+            lines.setdefault(row["食谱编号"], []).append(_line_from_row(row))
+
+        recipe_cols = RECIPE_COLUMNS + RECIPE_EXTRA_COLUMNS
+        recipes = []
+        for values in recipe_rows:
+            row = dict(zip(recipe_cols, values))
+            recipes.append(_recipe_from_row(row, lines.get(row["食谱编号"], [])))
+        return recipes
+
+    def load_recipes(self):
+        return self._select_recipes()
+
+    def iter_recipes(self, fields=None, category=None, ids=None):
+        clauses, params = [], []
+        if category == UNCATEGORIZED or category == "":
+            # Same as recipe_store.category_label: a missing 分类 lists as UNCATEGORIZED
+            clauses.append("(分类 IS NULL OR 分类 = '' OR 分类 = ?)")
+            params.append(UNCATEGORIZED)
+        elif category is not None:
+            clauses.append("分类 = ?")
+            params.append(category)
+        if ids is not None:
+            ids = list(ids)
+            clauses.append(f"食谱编号 IN ({', '.join('?' for _ in ids)})")
+            params += ids
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        for recipe in self._select_recipes(where, params):
+            yield recipe if fields is None else {k: recipe[k] for k in fields if k in recipe}
+
+    def get_recipe(self, recipe_id):
+        found = self._select_recipes("WHERE 食谱编号 = ?", (recipe_id,))
+        return found[0] if found else None
+
+    def recipe_categories(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT 分类 FROM recipes GROUP BY 分类 ORDER BY MIN(rowid)").fetchall()
+        return [row[0] for row in rows]
+
+    def next_recipe_id(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT 食谱编号 FROM recipes").fetchall()
+        return next_recipe_id(rid for rid, in rows)
+
+    def save_recipes(self, recipes):
+        """Replace every recipe (used by bulk jobs, not by single edits)."""
+        def write(conn):
+            conn.execute("DELETE FROM recipes")
+            for recipe in recipes:
+                _upsert_recipe(conn, recipe)
+        self._write(write)
+
+    def upsert_recipes(self, recipes):
+        def write(conn):
+            for recipe in recipes:
+                _upsert_recipe(conn, recipe)
+        self._write(write)
+
+    def save_recipe(self, recipe):
+        self._write(lambda conn: _upsert_recipe(conn, recipe))
+
+    def insert_recipe(self, recipe):
+        """Save a new recipe; ValueError if its 编号 exists (save_recipe would replace it)."""
+        def write(conn):
+            rid = recipe.get("编号")
+            if conn.execute("SELECT 1 FROM recipes WHERE 食谱编号 = ?", (rid,)).fetchone():
+                raise ValueError(f"菜谱编号 {rid} 已存在")
+            _upsert_recipe(conn, recipe)
+        self._write(write)
+
+    def delete_recipe(self, recipe_id):
+        self._write(lambda conn: conn.execute("DELETE FROM recipes WHERE 食谱编号 = ?", (recipe_id,)))
+
+    def ingredient_index(self, recipes=None):
+        index = IngredientIndex()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT 食谱编号, 食材编号 FROM recipe_ingredients ORDER BY 食谱编号"
+            ).fetchall()
+        grouped = {}
+        for rid, serial in rows:
+            grouped.setdefault(rid, []).append({"编号": serial})
+        for rid, ings in grouped.items():
+            index.add_recipe({"编号": rid, "食材": ings})
+        return index
+
+    def image_index(self, recipes=None):
+        if recipes is None:
+            recipes = self.iter_recipes(fields=ImageIndex.FIELDS)
+        return ImageIndex(recipes)
+
+    # --- Backups ---
+    def backup(self, timestamp):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        tmp_path = os.path.join(self.backup_dir, f"recipes_backup_{timestamp}.db.tmp")
+        target = sqlite3.connect(tmp_path)
+        with self._lock:
+            self._conn.backup(target)
+        target.close()
+        try:
+            return snapshot({"db": tmp_path}, timestamp, self.backup_dir)
+        finally:
+            os.remove(tmp_path)
+
+    def restore(self, timestamp=None):
+        snap = find_snapshot(timestamp, self.backup_dir)
+        if snap is None or "db" not in snap["files"]:
+            raise FileNotFoundError(f"No database backup at or before {timestamp}")
+        # Keep the current state so the restore can be undone
+        self.backup(datetime.now().strftime(TIMESTAMP_FORMAT))
+
+        tmp_path = os.path.join(self.backup_dir, "restore.db.tmp")
+        extract_file(snap, "db", tmp_path, self.backup_dir)
+        source = sqlite3.connect(tmp_path)
+        with self._lock:
+            source.backup(self._conn)
+            self._local_writes += 1
+        source.close()
+        os.remove(tmp_path)
+        return snap
+
+    # --- Migration ---
+    def import_files(self, ingredient_path=DATA_FILE, recipe_path=RECIPE_FILE):
+        """One-shot import of ingredients.csv + recipes.json (replaces table contents)."""
+        df = clean_ingredient_df(pd.read_csv(ingredient_path)) if os.path.exists(ingredient_path) else None
+        recipes = load_recipes(recipe_path)
+
+        def write(conn):
+            conn.execute("DELETE FROM ingredients")
+            conn.execute("DELETE FROM recipes")
+            if df is not None:
+                _upsert_ingredients(conn, _ingredient_rows(df))
+            for recipe in recipes:
+                _upsert_recipe(conn, recipe)
+        self._write(write)
+        return (0 if df is None else len(df)), len(recipes)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _sql_value(value):
+    """NaN -> NULL, numpy scalars -> Python scalars."""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _ingredient_rows(df):
+    df = df.reindex(columns=INGREDIENT_COLUMNS)
+    return [tuple(_sql_value(v) for v in row) for row in df.itertuples(index=False, name=None)]
+
+
+def _upsert_sql(table, cols, key):
+    # ON CONFLICT keeps the rowid, so edited rows keep their position
+    updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c != key)
+    return (
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    )
+
+
+def _upsert_ingredients(conn, rows):
+    conn.executemany(_upsert_sql("ingredients", INGREDIENT_COLUMNS, "编号"), rows)
+
+
+def _upsert_recipe(conn, recipe):
+    row = {col: None for col in RECIPE_COLUMNS + RECIPE_EXTRA_COLUMNS}
+    extra = {}
+    for key, value in recipe.items():
+        if key in RECIPE_KEY_TO_COLUMN:
+            row[RECIPE_KEY_TO_COLUMN[key]] = _sql_value(value)
+        elif key not in ("食材", "步骤"):
+            extra[key] = value
+    row["步骤"] = json.dumps(recipe.get("步骤", []), ensure_ascii=False, default=_json_default)
+    row["其他"] = json.dumps(extra, ensure_ascii=False, default=_json_default) if extra else None
+
+    rid = row["食谱编号"]
+    cols = list(row)
+    conn.execute(_upsert_sql("recipes", cols, "食谱编号"), [row[c] for c in cols])
+    conn.execute("DELETE FROM recipe_ingredients WHERE 食谱编号 = ?", (rid,))
+
+    line_cols = RECIPE_INGREDIENT_COLUMNS + RECIPE_INGREDIENT_EXTRA_COLUMNS
+    lines = []
+    for pos, ing in enumerate(recipe.get("食材", [])):
+        line = {col: None for col in line_cols}
+        line["食谱编号"] = rid
+        line["行号"] = pos
+        extra = {}
+        for key, value in ing.items():
+            if key in LINE_KEY_TO_COLUMN:
+                line[LINE_KEY_TO_COLUMN[key]] = _sql_value(value)
+            else:
+                extra[key] = value
+        line["其他"] = json.dumps(extra, ensure_ascii=False, default=_json_default) if extra else None
+        lines.append([line[c] for c in line_cols])
+    conn.executemany(
+        f"INSERT INTO recipe_ingredients ({', '.join(line_cols)}) VALUES ({', '.join('?' for _ in line_cols)})",
+        lines,
+    )
+
+
+def _recipe_from_row(row, ingredients):
+    recipe = {}
+    for key, col in RECIPE_KEY_TO_COLUMN.items():
+        recipe[key] = row[col]
+    recipe["食材"] = ingredients
+    recipe["步骤"] = json.loads(row["步骤"]) if row["步骤"] else []
+    if row["其他"]:
+        recipe.update(json.loads(row["其他"]))
+    return recipe
+
+
+def _line_from_row(row):
+    line = {}
+    for key, col in LINE_KEY_TO_COLUMN.items():
+        if col == "单位" and row[col] is None:
+            continue
+        line[key] = row[col]
+    if row["其他"]:
+        line.update(json.loads(row["其他"]))
+    return line
+
+
+_STORAGES = {}
+_STORAGES_LOCK = threading.Lock()
+
+
+def get_storage(kind=None):
+    """Backend selected by the RECIPE_APP_STORAGE env var ("file" by default).
+
+    Instances are cached per process so the SQLite connection and its
+    catalog cache survive Streamlit reruns.
+    """
+    kind = (kind or os.environ.get(STORAGE_ENV, "file")).lower()
+    with _STORAGES_LOCK:
+        if kind not in _STORAGES:
+            if kind == "sqlite":
+                _STORAGES[kind] = SqliteStorage(os.environ.get(DB_ENV, DB_FILE))
+            elif kind == "file":
+                _STORAGES[kind] = FileStorage()
+            else:
+                raise ValueError(f"Unknown storage backend: {kind}")
+        return _STORAGES[kind]
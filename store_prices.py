@@ -0,0 +1,193 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catalog import Catalog
+from helper_functions import compute_unit_costs
+from scenarios import ScenarioRunner
+
+# One small CSV per location on top of the shared ingredients.csv:
+#   stores/<门店>.csv   编号, 单位价格, 供应商
+# Only the rows whose price or supplier differ from the base catalog are
+# kept; a blank cell means "same as the base".
+STORE_DIR = "stores"
+OVERLAY_COLUMNS = ["编号", "单位价格", "供应商"]
+
+# Process-wide caches: overlay path -> StoreOverlay, and
+# (base catalog version, store folder, store, overlay digest) -> layered Catalog
+_OVERLAY_CACHE = {}
+_LAYERED_CACHE = {}
+MAX_CACHED_CATALOGS = 8
+_CACHE_LOCK = threading.Lock()
+
+
+def check_store_name(store):
+    """The stripped store name; ValueError for names that aren't a plain file name."""
+    name = str(store or "").strip()
+    if not name:
+        raise ValueError("门店名称不能为空")
+    if ".." in name or "/" in name or "\\" in name or "\0" in name or name.startswith("."):
+        raise ValueError(f"门店名称不能包含 / \\ .. 或以 . 开头：{name}")
+    return name
+
+
+def overlay_path(store, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"{check_store_name(store)}.csv")
+
+
+def list_stores(store_dir=STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(os.path.splitext(n)[0] for n in os.listdir(store_dir) if n.endswith(".csv"))
+
+
+def _clean_overlay(df):
+    """Overlay rows with OVERLAY_COLUMNS: 单位价格 float (NaN = base), 供应商 str ("" = base).
+    Rows without a 编号 or without any override are dropped; a repeated 编号 keeps its last row."""
+    df = df.reindex(columns=OVERLAY_COLUMNS)
+    df = pd.DataFrame({
+        "编号": df["编号"].fillna("").astype(str).str.strip(),
+        "单位价格": pd.to_numeric(df["单位价格"], errors="coerce"),
+        "供应商": df["供应商"].fillna("").astype(str).str.strip(),
+    })
+    df = df[(df["编号"] != "") & (df["单位价格"].notna() | (df["供应商"] != ""))]
+    return df.drop_duplicates("编号", keep="last").reset_index(drop=True)
+
+
+class StoreOverlay:
+    """One store's overrides: `df` with OVERLAY_COLUMNS, one row per 编号."""
+
+    def __init__(self, store, df, signature=None, digest="", store_dir=STORE_DIR):
+        self.store = store
+        self.store_dir = store_dir
+        self.df = _clean_overlay(df)
+        self.signature = signature
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.df)
+
+    def prices(self):
+        """编号 -> overridden 单位价格."""
+        rows = self.df[self.df["单位价格"].notna()]
+        return dict(zip(rows["编号"].tolist(), rows["单位价格"].tolist()))
+
+    def suppliers(self):
+        """编号 -> overridden 供应商."""
+        rows = self.df[self.df["供应商"] != ""]
+        return dict(zip(rows["编号"].tolist(), rows["供应商"].tolist()))
+
+
+def load_overlay(store, store_dir=STORE_DIR):
+    """Cached StoreOverlay for `store` (empty when the store has no file yet)."""
+    path = overlay_path(store, store_dir)
+    if not os.path.exists(path):
+        return StoreOverlay(store, pd.DataFrame(columns=OVERLAY_COLUMNS), store_dir=store_dir)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(path)
+    with _CACHE_LOCK:
+        cached = _OVERLAY_CACHE.get(key)
+        if cached is not None and cached.signature == signature:
+            return cached
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    overlay = StoreOverlay(store, pd.read_csv(path, dtype={"编号": str, "供应商": str}, encoding="utf-8-sig"),
+                           signature, digest, store_dir)
+    with _CACHE_LOCK:
+        _OVERLAY_CACHE[key] = overlay
+    return overlay
+
+
+def save_overlay(store, df, catalog, store_dir=STORE_DIR):
+    """Write a store's overrides, keeping only cells that differ from `catalog`.
+
+    Unknown 编号s are dropped too. Returns the rows written; ValueError for
+    a bad store name (see check_store_name), before anything is written.
+    """
+    path = overlay_path(store, store_dir)
+    df = _clean_overlay(df)
+    df = df[df["编号"].isin(list(catalog.by_serial))]
+    base_price = df["编号"].map(lambda s: catalog.by_serial[s].get("单位价格"))
+    base_supplier = df["编号"].map(lambda s: catalog.by_serial[s].get("供应商") or "")
+    df = df.assign(
+        单位价格=df["单位价格"].where(df["单位价格"] != base_price),
+        供应商=df["供应商"].where(df["供应商"] != base_supplier, ""),
+    )
+    df = df[df["单位价格"].notna() | (df["供应商"] != "")]
+
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    os.replace(tmp_path, path)
+    return df
+
+
+def store_catalog(catalog, overlay):
+    """The base Catalog with one store's overrides applied (the base itself when
+    the overlay is empty). Cached per (catalog version, overlay content)."""
+    if len(overlay) == 0:
+        return catalog
+    key = (catalog.version, os.path.abspath(overlay.store_dir), overlay.store, overlay.digest)
+    with _CACHE_LOCK:
+        cached = _LAYERED_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    df = catalog.df.copy()
+    rows = df["编号"].isin(list(overlay.df["编号"]))
+    prices, suppliers = overlay.prices(), overlay.suppliers()
+    serials = df.loc[rows, "编号"]
+    df.loc[rows, "单位价格"] = serials.map(prices).fillna(df.loc[rows, "单位价格"])
+    df.loc[rows, "供应商"] = serials.map(suppliers).fillna(df.loc[rows, "供应商"])
+    df.loc[rows, "基础单位价格"] = compute_unit_costs(
+        df.loc[rows, "单位"], df.loc[rows, "单位价格"], df.loc[rows, "单位容量"]
+    ).values
+
+    layered = Catalog(
+        os.path.join(overlay.store_dir, overlay.store), df, catalog.signature,
+        f"{catalog.version}+{overlay.store}:{overlay.digest}",
+    )
+    with _CACHE_LOCK:
+        _LAYERED_CACHE[key] = layered
+        while len(_LAYERED_CACHE) > MAX_CACHED_CATALOGS:
+            _LAYERED_CACHE.pop(next(iter(_LAYERED_CACHE)))
+    return layered
+
+
+def store_price_matrix(serials, base_prices, catalog, overlays):
+    """(ingredients × stores) 基础单位价格: `base_prices` (aligned with `serials`)
+    with each store's 单位价格 overrides priced in, one column per overlay.
+
+    All overrides of all stores go through compute_unit_costs in one call.
+    """
+    prices = np.repeat(np.asarray(base_prices, dtype=float)[:, None], len(overlays), axis=1)
+    position = {serial: i for i, serial in enumerate(serials)}
+    cols, rows, units, costs, volumes = [], [], [], [], []
+    for j, overlay in enumerate(overlays):
+        for serial, price in overlay.prices().items():
+            base = catalog.get(serial)
+            if base is None or serial not in position:
+                continue  # not in the base catalog, or no recipe uses it
+            cols.append(j)
+            rows.append(position[serial])
+            units.append(base.get("单位"))
+            costs.append(price)
+            volumes.append(base.get("单位容量"))
+    if rows:
+        prices[rows, cols] = compute_unit_costs(units, costs, volumes).to_numpy(dtype=float)
+    return prices
+
+
+def store_costs(recipes, catalog, overlays):
+    """Every recipe costed for every store in one batch.
+
+    Same long format as ScenarioRunner.run (RESULT_COLUMNS), with the store
+    name in 情景 and the base catalog as 原成本.
+    """
+    runner = ScenarioRunner(recipes, catalog)
+    prices = store_price_matrix(runner.costs.serials, runner.base_prices, catalog, overlays)
+    return runner.compare([o.store for o in overlays], prices)
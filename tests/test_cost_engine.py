@@ -0,0 +1,23 @@
+import math
+
+from cost_engine import CostMatrix
+
+
+def _recipe(serial, sale):
+    recipe = {"编号": serial, "食材": [{"编号": "RME-0001", "用量": 100}]}
+    if sale is not ...:
+        recipe["售价"] = sale
+    return recipe
+
+
+def test_missing_or_zero_sale_price_gives_zero_percent():
+    recipes = [_recipe("R1", None), _recipe("R2", ""), _recipe("R3", 0), _recipe("R4", ...), _recipe("R5", 50)]
+    matrix = CostMatrix(recipes)
+
+    costs, percents = matrix.recipe_costs({"RME-0001": 0.2})
+    matrix.apply({"RME-0001": 0.2})
+
+    assert [r["总成本"] for r in recipes] == [20.0] * 5
+    assert [r["成本百分比"] for r in recipes] == [0, 0, 0, 0, 40.0]
+    assert percents.tolist() == [0, 0, 0, 0, 40.0]
+    assert not any(math.isnan(r["成本百分比"]) for r in recipes)
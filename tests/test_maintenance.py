@@ -0,0 +1,26 @@
+import os
+import shutil
+
+import maintenance
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_shim_paths_keep_side_files_beside_the_data(tmp_path, monkeypatch):
+    # Same layout as the helpers/ shims: run from a subfolder with "../" paths
+    shutil.copy(os.path.join(REPO, "ingredients.csv"), tmp_path / "ingredients.csv")
+    shutil.copy(os.path.join(REPO, "recipes.json"), tmp_path / "recipes.json")
+    helpers = tmp_path / "helpers"
+    helpers.mkdir()
+    monkeypatch.chdir(helpers)
+    monkeypatch.delenv(maintenance.STORAGE_ENV, raising=False)
+
+    uploads = tmp_path / maintenance.UPLOAD_DIR
+    uploads.mkdir()
+    (uploads / "orphan.jpg").write_bytes(b"not referenced by any recipe")
+
+    maintenance.main(["all", "gc-images", "--grace-hours", "0"], "../ingredients.csv", "../recipes.json")
+
+    assert os.listdir(helpers) == []
+    assert (tmp_path / "price_history.csv").exists()
+    assert not (uploads / "orphan.jpg").exists()
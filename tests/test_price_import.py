@@ -0,0 +1,39 @@
+import io
+
+import pandas as pd
+
+from price_import import import_price_list, read_price_list
+
+NOW = "2026-01-01 00:00:00"
+
+
+def _catalog():
+    return pd.DataFrame([{
+        "编号": "RME-0001", "供应商": "", "食材英文名": "", "食材中文名": "牛舌", "食材分类": "未加工肉类",
+        "单位": "kg", "单位价格": 370.0, "单位容量": 1000.0, "基础单位价格": 0.37,
+        "创建时间": NOW, "修改时间": NOW,
+    }])
+
+
+def _import(text):
+    return import_price_list(_catalog(), read_price_list(io.BytesIO(text.encode("utf-8")), "list.csv"), NOW)
+
+
+def test_header_only_list_changes_nothing():
+    updated, summary = _import("编号,食材中文名,单位价格\n")
+    assert summary == {"updated": {}, "added": [], "unchanged": 0, "skipped": 0}
+    assert updated.equals(_catalog())
+
+
+def test_list_without_usable_prices_is_skipped():
+    updated, summary = _import("编号,食材中文名,单位价格\nRME-0001,,\n,牛舌,abc\n")
+    assert summary["skipped"] == 2
+    assert not summary["updated"] and not summary["added"]
+    assert updated.equals(_catalog())
+
+
+def test_list_without_name_column_or_usable_prices():
+    # No 食材中文名 column at all: the reindexed column is all-NaN float
+    updated, summary = _import("编号,单价\nRME-0001,\n")
+    assert summary["skipped"] == 1
+    assert updated.equals(_catalog())
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from scenarios import summarize
+
+
+def test_largest_change_keeps_the_sign_of_the_biggest_move():
+    result = pd.DataFrame({
+        "情景": pd.Categorical(["降价", "降价", "涨价", "涨价"]),
+        "成本变化": [-30.0, 5.0, 2.0, -1.0],
+        "百分比变化": [-12.0, 2.0, 0.5, -3.0],
+    })
+
+    summary = summarize(result).set_index("情景")
+
+    assert summary.loc["降价", "最大成本变化"] == -30.0
+    assert summary.loc["降价", "最大百分比变化"] == -12.0
+    assert summary.loc["涨价", "最大成本变化"] == 2.0
+    assert summary.loc["涨价", "最大百分比变化"] == -3.0
+    assert summary.loc["降价", "受影响配方"] == 2
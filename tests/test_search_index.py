@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from search_index import SearchIndex
+
+
+def test_missing_names_are_not_indexed_as_nan():
+    df = pd.DataFrame({
+        "编号": ["RME-0001", "RME-0002", "RME-0003"],
+        "食材中文名": ["牛舌", np.nan, "Nan 面包"],
+        "食材英文名": [np.nan, "banana", "naan bread"],
+    }).astype({"食材中文名": "string", "食材英文名": "string"})
+
+    index = SearchIndex(df)
+
+    assert index.fields[0] == ["牛舌", ""]
+    assert index.fields[1] == ["", "banana"]
+    assert index.search("nan") == ["RME-0003", "RME-0002"]
+    assert index.search("牛舌") == ["RME-0001"]
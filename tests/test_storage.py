@@ -0,0 +1,24 @@
+import os
+
+import pandas as pd
+
+from storage import FileStorage, INGREDIENT_COLUMNS
+
+
+def test_price_history_is_kept_beside_the_ingredient_file(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+
+    storage = FileStorage(str(data_dir / "ingredients.csv"), str(data_dir / "recipes.json"))
+    assert storage.history_path == os.path.join(str(data_dir), "price_history.csv")
+
+    row = dict.fromkeys(INGREDIENT_COLUMNS, "")
+    row.update({"编号": "RME-0001", "食材中文名": "牛舌", "单位": "kg", "单位价格": 370.0, "单位容量": 1000})
+    storage.save_ingredients(pd.DataFrame([row]))
+
+    assert (data_dir / "price_history.csv").exists()
+    assert not (elsewhere / "price_history.csv").exists()
+    assert storage.load_price_history().serials == ["RME-0001"]
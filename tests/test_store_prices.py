@@ -0,0 +1,24 @@
+import os
+
+import pandas as pd
+
+from catalog import load_catalog
+from store_prices import load_overlay, save_overlay, store_catalog
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_layered_catalog_path_uses_the_overlay_store_dir(tmp_path):
+    catalog = load_catalog(os.path.join(REPO, "ingredients.csv"))
+    serial = next(iter(catalog.by_serial))
+    store_dir = str(tmp_path / "stores")
+    save_overlay("分店", pd.DataFrame({"编号": [serial], "单位价格": [123456.0], "供应商": [""]}),
+                 catalog, store_dir)
+
+    overlay = load_overlay("分店", store_dir)
+    assert overlay.store_dir == store_dir
+    assert load_overlay("新店", store_dir).store_dir == store_dir
+
+    layered = store_catalog(catalog, overlay)
+    assert layered.path == os.path.join(store_dir, "分店")
+    assert layered.by_serial[serial]["单位价格"] == 123456.0